@@ -1,16 +1,47 @@
-from fastapi import FastAPI, Depends, HTTPException, Header
+import asyncio
+import logging
+import threading
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from fastapi import (
+    FastAPI, Body, Depends, HTTPException, Header, Query, Request, WebSocket,
+    WebSocketDisconnect, WebSocketException, status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session, joinedload
 
-from infra.config import is_auth_enabled, get_api_key
-from infra.db import get_db
+from infra.config import (
+    ApiKey, is_auth_enabled, get_api_keys, hash_api_key,
+    is_rate_limit_enabled, get_default_rate_limit,
+    get_stream_batch_size, get_stream_batch_wait_ms, get_stream_queue_size,
+    is_batching_enabled, get_batch_max_size, get_batch_max_wait_ms, get_batch_timeout_s,
+    get_predict_batch_max_rows,
+    is_drift_monitoring_enabled, get_drift_interval_s, get_drift_half_life, get_drift_bootstrap_rows,
+)
+from infra.db import SessionLocal, get_db
 from infra.models import Input, Prediction
-from infra.db_utils import save_input, save_prediction
+from infra.db_utils import save_input, save_prediction, fetch_predictions_since, last_prediction_id
+from infra.rate_limit import RateLimitDecision, build_rate_limiter
+from infra.tracing import build_tracer, mark, span
 
-# src/model.py expose: load_model(), predict(dict)->float, get_model_info()->dict
-from src.model import predict, get_model_info, load_model
+# src/model.py expose: load_model(), predict(dict)->float, predict_batch(list)->list,
+# predict_interval_batch(list)->list, get_model_info()->dict, get_model_version()->str
+from src.model import (
+    predict, predict_batch, predict_interval_batch, get_model_info, get_model_version,
+    get_feature_schema, load_model, load_quantile_model,
+)
+from src.artifacts import check_feature_schema
+from src.batcher import DynamicBatcher
+from src.drift import DriftMonitor
+from src.explain import explain, explain_batch
 
 # pour valider le payload, on s'aligne sur es features
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, ValidationError, field_validator
 from datetime import datetime
 
 class PredictPayload(BaseModel):
@@ -28,24 +59,141 @@ class PredictPayload(BaseModel):
             raise ValueError("La valeur ne doit pas être vide.")
         return v
 
+logger = logging.getLogger(__name__)
+
+# type attendu par le modèle pour chaque champ du payload
+PAYLOAD_SCHEMA = {
+    name: "categorical" if field.annotation is str else "numeric"
+    for name, field in PredictPayload.model_fields.items()
+}
+
+def _check_model() -> None:
+    """Charge et vérifie le modèle au démarrage : un artefact corrompu ou incompatible empêche le lancement."""
+    load_model()
+    load_quantile_model()
+    check_feature_schema(get_feature_schema(), PAYLOAD_SCHEMA)
+    logger.info("Modèle %s vérifié et chargé", get_model_version())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    _check_model()
+    task = asyncio.create_task(_drift_loop()) if is_drift_monitoring_enabled() else None
+    yield
+    if task is not None:
+        task.cancel()
+
 app = FastAPI(
     title="API Prédiction CO₂",
     description="API pour prédire les émissions de CO₂ des bâtiments (Seattle).",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+UNIT = "Metric Tons CO2e"
+PRIVATE_METADATA = {"reference"}  # volumineux, utile au seul suivi de dérive
+
+# regroupement optionnel des requêtes /predict concurrentes (BATCHING_ENABLED)
+_batcher = (
+    DynamicBatcher(predict_batch, get_batch_max_size(), get_batch_max_wait_ms())
+    if is_batching_enabled()
+    else None
 )
 
-def _verify_api_key(x_api_key: str | None) -> None:
+_BATCH_TIMEOUT_S = get_batch_timeout_s()
+
+def _predict(features: dict) -> float:
+    if _batcher is None:
+        return predict(features)
+    try:
+        # délai fini : un thread du pool ne reste jamais bloqué sur un lot perdu
+        return _batcher.predict(features, timeout=_BATCH_TIMEOUT_S)
+    except FuturesTimeoutError:
+        raise HTTPException(status_code=503, detail="Prédiction indisponible : délai du micro-lot dépassé")
+
+@lru_cache(maxsize=1)
+def _model_info_bytes() -> bytes:
+    """Métadonnées du modèle sérialisées une seule fois (elles ne changent pas en cours d'exécution)."""
+    public = {k: v for k, v in get_model_info().items() if k not in PRIVATE_METADATA}
+    return orjson.dumps(public, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def _wants_minimal(minimal: bool, prefer: str | None) -> bool:
+    """Réponse réduite demandée via `?minimal=true` ou l'en-tête `Prefer: return=minimal`."""
+    if minimal:
+        return True
+    return bool(prefer) and "return=minimal" in prefer.replace(" ", "").lower()
+
+def _lookup_api_key(x_api_key: str | None) -> ApiKey | None:
+    return get_api_keys().get(hash_api_key(x_api_key)) if x_api_key else None
+
+def _verify_api_key(x_api_key: str | None) -> ApiKey | None:
     if not is_auth_enabled():
-        return
-    expected = get_api_key()
-    if not expected or x_api_key != expected:
+        return None
+    key = _lookup_api_key(x_api_key)
+    if key is None:
         raise HTTPException(status_code=401, detail="Clé API invalide ou absente")
+    return key
+
+# =======================
+# LIMITATION DE DÉBIT
+# =======================
+RATE_LIMIT_EXEMPT = {"/", "/health", "/docs", "/redoc", "/openapi.json"}
+# décomptés à la ligne : un lot coûte autant que le même nombre de requêtes unitaires
+RATE_LIMIT_PER_ROW = {"/predict/batch", "/explain/batch"}
+
+_rate_limiter = build_rate_limiter() if is_rate_limit_enabled() else None
+_anonymous_limits = get_default_rate_limit()
+
+async def _check_rate_limit(x_api_key: str | None, client_host: str | None, cost: int = 1) -> RateLimitDecision:
+    """Décompte `cost` lignes pour la clé API (ou, à défaut, l'adresse IP du client)."""
+    key = _lookup_api_key(x_api_key)
+    if key is not None:
+        return await _rate_limiter.hit(f"key:{key.name}", key, cost)
+    return await _rate_limiter.hit(f"ip:{client_host or 'unknown'}", _anonymous_limits, cost)
+
+async def _request_cost(request: Request) -> int:
+    """Nombre de lignes d'un lot (1 pour un corps invalide ou hors limite, rejeté ensuite)."""
+    if request.url.path not in RATE_LIMIT_PER_ROW:
+        return 1
+    try:
+        rows = orjson.loads(await request.body())  # corps mis en cache pour l'endpoint
+    except orjson.JSONDecodeError:
+        return 1
+    if isinstance(rows, list) and 0 < len(rows) <= get_predict_batch_max_rows():
+        return len(rows)
+    return 1
+
+@app.middleware("http")
+async def rate_limit_middleware(request: Request, call_next):
+    # appliqué avant le routage : une requête refusée n'atteint ni le modèle ni la BDD
+    if _rate_limiter is None or request.url.path in RATE_LIMIT_EXEMPT:
+        return await call_next(request)
+    decision = await _check_rate_limit(
+        request.headers.get("X-API-Key"),
+        request.client.host if request.client else None,
+        await _request_cost(request),
+    )
+    headers = decision.headers() if decision.limit else {}
+    if not decision.allowed:
+        detail = "Quota journalier atteint" if decision.reason == "quota" else "Limite de débit atteinte"
+        return ORJSONResponse(status_code=429, content={"detail": detail}, headers=headers)
+    response = await call_next(request)
+    response.headers.update(headers)
+    return response
+
+# =======================
+# TRAÇAGE
+# =======================
+# déclaré après la limitation de débit : middleware le plus externe, chaque réponse
+# (y compris 429) reçoit X-Request-ID et Server-Timing
+_tracer = build_tracer()
+app.middleware("http")(_tracer.middleware)
 
 @app.get("/")
 def home():
     return {
         "message": "Bienvenue sur l'API de prédiction CO₂",
-        "endpoints": ["/predict", "/model_info", "/predictions", "/health"],
+        "endpoints": ["/predict", "/predict/batch", "/ws/predict", "/explain", "/explain/batch", "/model_info", "/predictions", "/batching_stats", "/drift", "/metrics", "/health"],
     }
 
 @app.get("/health")
@@ -59,32 +207,155 @@ def health():
 @app.get("/model_info")
 def model_info(x_api_key: str | None = Header(default=None, alias="X-API-Key")):
     _verify_api_key(x_api_key)
-    return get_model_info()
+    return ORJSONResponse(content=orjson.Fragment(_model_info_bytes()))
 
 @app.post("/predict")
 def predict_endpoint(
     payload: PredictPayload,
     db: Session = Depends(get_db),
     x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+    minimal: bool = Query(default=False, description="Ne renvoyer que la prédiction et la version du modèle"),
+    prefer: str | None = Header(default=None),
+    interval: bool = Query(default=False, description="Ajouter un intervalle de prédiction (quantiles)"),
 ):
+    # lecture du corps, validation Pydantic et dépendances : depuis l'entrée dans le middleware
+    mark("validation")
     _verify_api_key(x_api_key)
+    if interval and load_quantile_model() is None:
+        raise HTTPException(status_code=503, detail="Intervalle indisponible : aucun modèle de quantiles chargé")
 
     # 1) prédiction via TON modèle (src/model.py)
     features = payload.model_dump()
-    y_pred = predict(features)
+    extra = {}
+    with span("model"):
+        if interval:
+            result = predict_interval_batch([features])[0]
+            y_pred = result["prediction"]
+            extra["interval"] = {
+                "lower": result["lower"],
+                "upper": result["upper"],
+                "quantiles": (get_model_info().get("quantiles") or {}).get("alphas"),
+            }
+        else:
+            y_pred = _predict(features)
 
     # 2) traçabilité: enregistrement input + output en BDD
-    input_id = save_input(db, features)
-    save_prediction(db, input_id, y_pred)
-    db.commit()
+    with span("db"):
+        input_id = save_input(db, features)
+        save_prediction(db, input_id, y_pred)
+    with span("commit"):
+        db.commit()
 
-    # 3) réponse
-    return {
-        "prediction": y_pred,
-        "unit": "Metric Tons CO2e",
-        "model_info": get_model_info(),
-        "input_features": payload,
-    }
+    # 3) réponse (sérialisée par orjson, sans passer par jsonable_encoder)
+    with span("serialize"):
+        if _wants_minimal(minimal, prefer):
+            return ORJSONResponse(
+                content={"prediction": y_pred, "model_version": get_model_version(), **extra},
+                headers={"Preference-Applied": "return=minimal"},
+            )
+        return ORJSONResponse(
+            content={
+                "prediction": y_pred,
+                "unit": UNIT,
+                "model_info": orjson.Fragment(_model_info_bytes()),
+                "input_features": features,
+                **extra,
+            }
+        )
+
+@app.post("/explain")
+def explain_endpoint(
+    payload: PredictPayload,
+    x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+):
+    """Contribution de chaque feature à la prédiction (valeurs SHAP calculées par XGBoost)."""
+    _verify_api_key(x_api_key)
+    return ORJSONResponse(content={"unit": UNIT, **explain(payload.model_dump())})
+
+@app.post("/explain/batch")
+def explain_batch_endpoint(
+    payloads: list[PredictPayload],
+    x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+):
+    _verify_api_key(x_api_key)
+    max_rows = get_predict_batch_max_rows()
+    if len(payloads) > max_rows:
+        raise HTTPException(status_code=413, detail=f"Lot trop volumineux (max {max_rows} lignes)")
+    return ORJSONResponse(
+        content={"unit": UNIT, "explanations": explain_batch([p.model_dump() for p in payloads])}
+    )
+
+@app.get("/batching_stats")
+def batching_stats(x_api_key: str | None = Header(default=None, alias="X-API-Key")):
+    _verify_api_key(x_api_key)
+    if _batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **_batcher.stats()}
+
+# =======================
+# DÉRIVE
+# =======================
+DRIFT_PAGE_SIZE = 5000
+_drift_monitor: DriftMonitor | None = None
+# une seule mise à jour à la fois (tâche de fond, /drift) : une ligne n'est jamais intégrée deux fois
+_drift_lock = threading.Lock()
+
+def _get_drift_monitor() -> DriftMonitor | None:
+    """Moniteur construit au premier usage, si le modèle embarque ses distributions de référence."""
+    global _drift_monitor
+    if _drift_monitor is None:
+        reference = get_model_info().get("reference")
+        if reference:
+            _drift_monitor = DriftMonitor(reference, half_life=get_drift_half_life())
+    return _drift_monitor
+
+def _refresh_drift() -> int:
+    """Intègre aux esquisses les prédictions journalisées depuis le dernier passage."""
+    monitor = _get_drift_monitor()
+    if monitor is None:
+        return 0
+    with _drift_lock, SessionLocal() as db:
+        after_id = monitor.last_id
+        if after_id is None:
+            after_id = max(0, last_prediction_id(db) - get_drift_bootstrap_rows())
+        total = 0
+        while True:
+            rows = fetch_predictions_since(db, after_id, DRIFT_PAGE_SIZE)
+            if rows:
+                after_id = rows[-1]["id"]
+            total += monitor.update(rows, after_id)
+            if len(rows) < DRIFT_PAGE_SIZE:
+                return total
+
+async def _drift_loop() -> None:
+    while True:
+        await asyncio.sleep(get_drift_interval_s())
+        try:
+            await run_in_threadpool(_refresh_drift)
+        except Exception:
+            logger.exception("Mise à jour des scores de dérive impossible")
+
+@app.get("/drift")
+def drift(
+    refresh: bool = Query(default=False, description="Intégrer immédiatement les nouvelles prédictions"),
+    x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+):
+    _verify_api_key(x_api_key)
+    monitor = _get_drift_monitor()
+    if monitor is None:
+        return {
+            "available": False,
+            "detail": "Le modèle ne contient pas de distributions de référence : ré-entraîner avec src/train_and_save.py",
+        }
+    if refresh or monitor.last_id is None:
+        _refresh_drift()
+    return monitor.report()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(x_api_key: str | None = Header(default=None, alias="X-API-Key")):
+    _verify_api_key(x_api_key)
+    monitor = _get_drift_monitor()
+    return monitor.prometheus() if monitor is not None else ""
 
 @app.get("/predictions")
 def predictions_history(
@@ -120,3 +391,170 @@ def predictions_history(
             }
         )
     return {"total_predictions": len(history), "predictions": history}
+
+
+# =======================
+# LOTS ET FLUX WEBSOCKET
+# =======================
+def _validation_errors(e: ValidationError) -> list[dict]:
+    return [{"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()]
+
+def _score_records(db: Session, records: list[tuple[Any, Any]]) -> list[dict]:
+    """Valide, score (un seul appel modèle) et trace en BDD une liste d'enregistrements.
+
+    Chaque enregistrement est un couple (identifiant par défaut, objet brut) ; un champ
+    `id` dans l'objet remplace l'identifiant par défaut. Les lignes invalides reçoivent
+    une erreur sans bloquer les autres.
+    """
+    results: list[dict] = []
+    valid: list[tuple[int, dict]] = []
+    with span("validation"):
+        for default_id, raw in records:
+            if not isinstance(raw, dict):
+                results.append({"id": default_id, "error": "Un objet JSON est attendu"})
+                continue
+            raw = dict(raw)
+            request_id = raw.pop("id", default_id)
+            try:
+                features = PredictPayload.model_validate(raw).model_dump()
+            except ValidationError as e:
+                results.append({"id": request_id, "error": _validation_errors(e)})
+                continue
+            valid.append((len(results), features))
+            results.append({"id": request_id})
+
+    if valid:
+        with span("model"):
+            y_preds = predict_batch([features for _, features in valid])
+        with span("db"):
+            for (idx, features), y_pred in zip(valid, y_preds):
+                input_id = save_input(db, features)
+                save_prediction(db, input_id, y_pred)
+                results[idx]["prediction"] = y_pred
+        with span("commit"):
+            db.commit()
+    return results
+
+@app.post("/predict/batch")
+def predict_batch_endpoint(
+    rows: list[dict[str, Any]] = Body(..., description="Liste d'objets PredictPayload (champ `id` facultatif)"),
+    db: Session = Depends(get_db),
+    x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+):
+    """Score un lot de bâtiments en un seul appel au modèle ; erreurs rapportées ligne par ligne."""
+    # lecture et décodage du corps : depuis l'entrée dans le middleware
+    mark("validation")
+    _verify_api_key(x_api_key)
+    max_rows = get_predict_batch_max_rows()
+    if len(rows) > max_rows:
+        raise HTTPException(status_code=413, detail=f"Lot trop volumineux (max {max_rows} lignes)")
+    predictions = _score_records(db, list(enumerate(rows)))
+    with span("serialize"):
+        return ORJSONResponse(
+            content={"unit": UNIT, "model_version": get_model_version(), "predictions": predictions}
+        )
+
+def _score_stream_batch(db: Session, messages: list[tuple[int, str]]) -> list[dict]:
+    """Décode puis score un micro-lot de messages texte du flux."""
+    records: list[tuple[Any, Any]] = []
+    for seq, text in messages:
+        try:
+            records.append((seq, orjson.loads(text)))
+        except orjson.JSONDecodeError:
+            records.append((seq, None))
+    return _score_records(db, records)
+
+async def _next_stream_batch(
+    queue: asyncio.Queue, max_size: int, max_wait: float
+) -> tuple[list[tuple[int, str]], bool]:
+    """Attend un premier message puis regroupe ceux qui arrivent dans la fenêtre `max_wait` (s).
+
+    Renvoie le lot et un booléen indiquant que le client a fermé le flux.
+    """
+    first = await queue.get()
+    if first is None:
+        return [], True
+    batch = [first]
+    deadline = asyncio.get_running_loop().time() + max_wait
+    while len(batch) < max_size:
+        remaining = deadline - asyncio.get_running_loop().time()
+        try:
+            if remaining > 0:
+                item = await asyncio.wait_for(queue.get(), remaining)
+            else:
+                item = queue.get_nowait()
+        except (asyncio.TimeoutError, asyncio.QueueEmpty):
+            break
+        if item is None:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+async def _throttle_stream(x_api_key: str | None, client_host: str | None, cost: int) -> bool:
+    """Décompte un micro-lot ; attend si le débit est dépassé, False si le quota est épuisé.
+
+    Pendant l'attente la file se remplit puis la lecture du flux est suspendue :
+    le client est ralenti au débit de sa clé.
+    """
+    while True:
+        decision = await _check_rate_limit(x_api_key, client_host, cost)
+        if decision.allowed:
+            return True
+        if decision.reason == "quota":
+            return False
+        await asyncio.sleep(decision.retry_after)
+
+@app.websocket("/ws/predict")
+async def predict_stream(
+    websocket: WebSocket,
+    db: Session = Depends(get_db),
+    x_api_key: str | None = Header(default=None, alias="X-API-Key"),
+):
+    """Prédictions en continu sur une seule connexion.
+
+    Chaque message texte est un objet `PredictPayload` avec un champ `id` facultatif ;
+    chaque réponse vaut `{"id", "prediction"}` ou `{"id", "error"}`. Les messages sont
+    regroupés en micro-lots scorés en un seul appel au modèle. La file d'attente est
+    bornée : si le client lit trop lentement, la lecture du flux est suspendue.
+    """
+    try:
+        _verify_api_key(x_api_key)
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+    client_host = websocket.client.host if websocket.client else None
+    if _rate_limiter is not None:
+        decision = await _check_rate_limit(x_api_key, client_host)
+        if not decision.allowed:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Limite de débit atteinte")
+    await websocket.accept()
+
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=get_stream_queue_size())
+
+    async def receive() -> None:
+        seq = 0
+        try:
+            while True:
+                text = await websocket.receive_text()
+                await queue.put((seq, text))  # bloque si le scoring est en retard
+                seq += 1
+        except Exception:  # déconnexion ou trame non texte : fin du flux
+            await queue.put(None)
+
+    receiver = asyncio.create_task(receive())
+    max_size = get_stream_batch_size()
+    max_wait = get_stream_batch_wait_ms() / 1000
+    try:
+        closed = False
+        while not closed:
+            batch, closed = await _next_stream_batch(queue, max_size, max_wait)
+            if not batch:
+                continue
+            if _rate_limiter is not None and not await _throttle_stream(x_api_key, client_host, len(batch)):
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Quota journalier atteint")
+                break
+            for result in await run_in_threadpool(_score_stream_batch, db, batch):
+                await websocket.send_text(orjson.dumps(result).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
@@ -1,5 +1,8 @@
 # infra/config.py
+import hashlib
 import os
+from functools import lru_cache
+from typing import NamedTuple
 from dotenv import load_dotenv
 
 # On choisit quel fichier .env charger
@@ -46,4 +49,178 @@ def is_auth_enabled() -> bool:
 
 def get_api_key() -> str | None:
     """Retourne la clé API attendue si l'authentification est activée."""
-    return os.getenv("API_KEY")
\ No newline at end of file
+    return os.getenv("API_KEY")
+
+
+class ApiKey(NamedTuple):
+    """Client identifié par une clé API et ses limites (0 = illimité)."""
+    name: str
+    rate_per_second: float
+    burst: int
+    daily_quota: int
+
+
+def hash_api_key(key: str) -> str:
+    return hashlib.sha256(key.strip().encode("utf-8")).hexdigest()
+
+
+def get_default_rate_limit(name: str = "anonymous") -> ApiKey:
+    """Limites appliquées aux clés sans limites propres et aux clients anonymes."""
+    return ApiKey(
+        name=name,
+        rate_per_second=max(0.0, _as_float(os.getenv("RATE_LIMIT_RPS"), default=5.0)),
+        burst=max(1, _as_int(os.getenv("RATE_LIMIT_BURST"), default=20)),
+        daily_quota=max(0, _as_int(os.getenv("DAILY_QUOTA"), default=0)),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_api_keys() -> dict[str, ApiKey]:
+    """Clés API autorisées, indexées par empreinte SHA-256 et lues une seule fois.
+
+    `API_KEYS` contient des entrées `nom:clé[:req_par_s[:rafale[:quota_jour]]]` séparées
+    par des virgules ; `API_KEY` reste accepté sous le nom `default`.
+    """
+    keys: dict[str, ApiKey] = {}
+    legacy = get_api_key()
+    if legacy and legacy.strip():
+        keys[hash_api_key(legacy)] = get_default_rate_limit("default")
+    for entry in (os.getenv("API_KEYS") or "").split(","):
+        parts = [p.strip() for p in entry.split(":")]
+        if len(parts) < 2 or not parts[0] or not parts[1]:
+            continue
+        default = get_default_rate_limit(parts[0])
+        extra = parts[2:] + [""] * 3
+        keys[hash_api_key(parts[1])] = ApiKey(
+            name=parts[0],
+            rate_per_second=max(0.0, _as_float(extra[0], default.rate_per_second)),
+            burst=max(1, _as_int(extra[1], default.burst)),
+            daily_quota=max(0, _as_int(extra[2], default.daily_quota)),
+        )
+    return keys
+
+
+def _as_int(value: str | None, default: int) -> int:
+    try:
+        return int(value) if value is not None and value.strip() else default
+    except ValueError:
+        return default
+
+
+def _as_float(value: str | None, default: float) -> float:
+    try:
+        return float(value) if value is not None and value.strip() else default
+    except ValueError:
+        return default
+
+
+def get_stream_batch_size() -> int:
+    """Nombre maximal d'enregistrements scorés ensemble sur le flux WebSocket."""
+    return max(1, _as_int(os.getenv("STREAM_BATCH_SIZE"), default=64))
+
+
+def get_stream_batch_wait_ms() -> float:
+    """Fenêtre (ms) pendant laquelle le flux WebSocket regroupe les arrivées en micro-lot."""
+    return max(0.0, _as_float(os.getenv("STREAM_BATCH_WAIT_MS"), default=10.0))
+
+
+def get_stream_queue_size() -> int:
+    """Nombre d'enregistrements en attente au-delà duquel la lecture du flux est suspendue."""
+    return max(1, _as_int(os.getenv("STREAM_QUEUE_SIZE"), default=256))
+
+
+def is_batching_enabled() -> bool:
+    """Indique si les appels concurrents à /predict sont regroupés en micro-lots."""
+    return _as_bool(os.getenv("BATCHING_ENABLED"), default=False)
+
+
+def get_batch_max_size() -> int:
+    """Nombre maximal de requêtes /predict regroupées dans un même appel au modèle."""
+    return max(1, _as_int(os.getenv("BATCH_MAX_SIZE"), default=64))
+
+
+def get_batch_max_wait_ms() -> float:
+    """Fenêtre (ms) d'attente des requêtes concurrentes avant d'appeler le modèle."""
+    return max(0.0, _as_float(os.getenv("BATCH_MAX_WAIT_MS"), default=2.0))
+
+
+def get_batch_timeout_s() -> float:
+    """Attente maximale (s) du résultat d'une requête /predict regroupée."""
+    return max(0.1, _as_float(os.getenv("BATCH_TIMEOUT_S"), default=5.0))
+
+
+def get_predict_batch_max_rows() -> int:
+    """Nombre maximal de lignes acceptées par /predict/batch."""
+    return max(1, _as_int(os.getenv("PREDICT_BATCH_MAX_ROWS"), default=1000))
+
+
+def is_rate_limit_enabled() -> bool:
+    """Indique si la limitation de débit et les quotas par clé API sont appliqués."""
+    return _as_bool(os.getenv("RATE_LIMIT_ENABLED"), default=False)
+
+
+def get_rate_limit_backend() -> str:
+    """Stockage des compteurs : `memory` (par processus) ou `redis` (partagé entre workers)."""
+    return (os.getenv("RATE_LIMIT_BACKEND") or "memory").strip().lower()
+
+
+def get_redis_url() -> str:
+    return os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+def is_drift_monitoring_enabled() -> bool:
+    """Indique si les scores de dérive sont recalculés périodiquement en tâche de fond."""
+    return _as_bool(os.getenv("DRIFT_MONITORING_ENABLED"), default=True)
+
+
+def get_drift_interval_s() -> float:
+    """Période (s) de mise à jour des esquisses de dérive depuis le journal des prédictions."""
+    return max(1.0, _as_float(os.getenv("DRIFT_INTERVAL_S"), default=300.0))
+
+
+def get_drift_half_life() -> int:
+    """Demi-vie (en lignes) de l'oubli exponentiel appliqué aux esquisses de dérive."""
+    return max(1, _as_int(os.getenv("DRIFT_HALF_LIFE"), default=5000))
+
+
+def get_drift_bootstrap_rows() -> int:
+    """Nombre de lignes récentes du journal lues au premier calcul (pas de relecture complète)."""
+    return max(0, _as_int(os.getenv("DRIFT_BOOTSTRAP_ROWS"), default=10000))
+
+
+def get_slow_request_ms() -> float:
+    """Durée (ms) au-delà de laquelle une requête est journalisée avec le détail de ses étapes."""
+    return max(0.0, _as_float(os.getenv("SLOW_REQUEST_MS"), default=500.0))
+
+
+def get_slow_request_sample_rate() -> float:
+    """Proportion des requêtes lentes effectivement journalisées (entre 0 et 1)."""
+    return min(1.0, max(0.0, _as_float(os.getenv("SLOW_REQUEST_SAMPLE_RATE"), default=1.0)))
+
+
+def get_otlp_endpoint() -> str | None:
+    """Collecteur OpenTelemetry (OTLP/HTTP) ou `file://<chemin>` ; export désactivé si absent."""
+    return os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or None
+
+
+def get_service_name() -> str:
+    return os.getenv("OTEL_SERVICE_NAME", "co2-api")
+
+
+def get_model_compression() -> int | tuple[str, int]:
+    """Compression joblib des artefacts : niveau zlib (`3`) ou `méthode:niveau` (`lzma:6`, `lz4:3`).
+
+    Voir `python -m src.artifacts` pour comparer taille et temps de chargement.
+    """
+    value = (os.getenv("MODEL_COMPRESSION") or "3").strip().lower()
+    method, _, level = value.rpartition(":")
+    if not level.isdigit():  # méthode seule, ex. `lzma`
+        method, level = value, ""
+    if not method:
+        return max(0, _as_int(level, default=3))
+    return method, max(0, _as_int(level, default=3))
+
+
+def get_model_version_pin() -> str | None:
+    """Version d'artefact à servir (répertoire sous `models/`) ; à défaut, celle de `models/CURRENT`."""
+    return os.getenv("MODEL_VERSION") or None
@@ -1,3 +1,4 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from infra.models import Input, Prediction
 
@@ -12,3 +13,27 @@ def save_prediction(db: Session, input_id: int, value: float) -> int:
     db.add(row)
     db.flush()
     return row.id
+
+def fetch_predictions_since(db: Session, after_id: int, limit: int) -> list[dict]:
+    """Lignes du journal (features + prédiction) d'identifiant > `after_id`, par ordre croissant."""
+    rows = (
+        db.query(
+            Prediction.id,
+            Prediction.predicted_co2,
+            Input.PrimaryPropertyType,
+            Input.YearBuilt,
+            Input.NumberofBuildings,
+            Input.NumberofFloors,
+            Input.LargestPropertyUseType,
+            Input.LargestPropertyUseTypeGFA,
+        )
+        .join(Input, Prediction.input_id == Input.id)
+        .filter(Prediction.id > after_id)
+        .order_by(Prediction.id)
+        .limit(limit)
+        .all()
+    )
+    return [dict(row._mapping) for row in rows]
+
+def last_prediction_id(db: Session) -> int:
+    return db.query(func.coalesce(func.max(Prediction.id), 0)).scalar()
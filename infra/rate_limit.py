@@ -0,0 +1,191 @@
+# infra/rate_limit.py
+# Limitation de débit (seau à jetons) et quota journalier par client.
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, NamedTuple
+
+from infra.config import ApiKey, get_rate_limit_backend, get_redis_url
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int  # secondes avant que la fenêtre courante soit de nouveau pleine
+    retry_after: int  # secondes avant de réessayer (0 si autorisé)
+    reason: str | None = None  # "rate" ou "quota" si refusé
+
+    def headers(self) -> dict[str, str]:
+        h = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+        }
+        if not self.allowed:
+            h["Retry-After"] = str(self.retry_after)
+        return h
+
+
+def _day(now: float) -> str:
+    return datetime.fromtimestamp(now, tz=timezone.utc).strftime("%Y%m%d")
+
+
+def _seconds_to_midnight(now: float) -> int:
+    current = datetime.fromtimestamp(now, tz=timezone.utc)
+    midnight = (current + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1, math.ceil((midnight - current).total_seconds()))
+
+
+def _decide(limits: ApiKey, tokens: float, used: int, now: float, reason: str | None,
+            needed: float = 1) -> RateLimitDecision:
+    """Construit la décision (et les en-têtes) à partir de l'état du seau et du quota."""
+    if reason == "quota":
+        wait = _seconds_to_midnight(now)
+        return RateLimitDecision(False, limits.daily_quota, 0, wait, wait, reason)
+    if limits.rate_per_second <= 0:
+        # pas de limite de débit : on expose le quota journalier (s'il existe)
+        if limits.daily_quota <= 0:
+            return RateLimitDecision(True, 0, 0, 0, 0)
+        return RateLimitDecision(
+            True, limits.daily_quota, max(0, limits.daily_quota - used), _seconds_to_midnight(now), 0
+        )
+    reset = math.ceil((limits.burst - tokens) / limits.rate_per_second)
+    if reason == "rate":
+        retry = max(1, math.ceil((needed - tokens) / limits.rate_per_second))
+        return RateLimitDecision(False, limits.burst, 0, reset, retry, reason)
+    return RateLimitDecision(True, limits.burst, max(0, int(tokens)), reset, 0)
+
+
+def _needed(limits: ApiKey, cost: int) -> int:
+    """Jetons exigés pour admettre une requête de `cost` unités.
+
+    Un lot plus grand que la rafale est admis seau plein puis laisse le seau en dette :
+    le coût total est décompté et les requêtes suivantes attendent son remboursement.
+    """
+    return min(cost, limits.burst)
+
+
+class InMemoryRateLimiter:
+    """Compteurs propres au processus : exacts avec un seul worker.
+
+    Chaque appel décompte `cost` unités (une par ligne scorée) du seau et du quota.
+    """
+
+    MAX_IDENTITIES = 10_000
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        # identité -> (jetons, horodatage, instant où le seau sera de nouveau plein)
+        self._buckets: dict[str, tuple[float, float, float]] = {}
+        self._usage: dict[str, tuple[str, int]] = {}  # identité -> (jour UTC, requêtes)
+        self._prune_at = self.MAX_IDENTITIES  # taille déclenchant le prochain nettoyage
+        self._day: str | None = None  # jour UTC du dernier nettoyage
+        self._lock = threading.Lock()
+
+    async def hit(self, identity: str, limits: ApiKey, cost: int = 1) -> RateLimitDecision:
+        return self.hit_sync(identity, limits, cost)
+
+    def hit_sync(self, identity: str, limits: ApiKey, cost: int = 1) -> RateLimitDecision:
+        now = self._clock()
+        day = _day(now)
+        with self._lock:
+            # avec ou sans seau (quota seul), chaque identité a une entrée dans `_usage`
+            new = identity not in self._usage
+            if day != self._day or (new and max(len(self._buckets), len(self._usage)) >= self._prune_at):
+                self._prune(now)
+            used_day, used = self._usage.get(identity, (day, 0))
+            if used_day != day:
+                used = 0
+            if limits.daily_quota > 0 and used + cost > limits.daily_quota:
+                return _decide(limits, 0.0, used, now, "quota")
+
+            tokens = float(limits.burst)
+            if limits.rate_per_second > 0:
+                previous = self._buckets.get(identity)
+                if previous is not None:
+                    tokens = min(limits.burst, previous[0] + (now - previous[1]) * limits.rate_per_second)
+                if tokens < _needed(limits, cost):
+                    return _decide(limits, tokens, used, now, "rate", _needed(limits, cost))
+                tokens -= cost
+                full_at = now + (limits.burst - tokens) / limits.rate_per_second
+                self._buckets[identity] = (tokens, now, full_at)
+
+            self._usage[identity] = (day, used + cost)
+            return _decide(limits, tokens, used + cost, now, None)
+
+    def _prune(self, now: float) -> None:
+        """Oublie les seaux redevenus pleins, chacun selon ses propres limites, et les compteurs
+        des jours passés (clients inactifs).
+
+        Appelé au changement de jour UTC et à l'arrivée d'une nouvelle identité au-delà du
+        seuil. Si la plupart des entrées restent actives, le seuil suivant est doublé : le
+        coût du nettoyage reste amorti.
+        """
+        self._day = _day(now)
+        self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+        self._usage = {k: v for k, v in self._usage.items() if v[0] == self._day}
+        self._prune_at = max(self.MAX_IDENTITIES, 2 * max(len(self._buckets), len(self._usage)))
+
+
+# KEYS[1] = seau, KEYS[2] = compteur du jour
+# ARGV = débit, rafale, quota, maintenant, ttl du compteur, coût
+_REDIS_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local quota = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local cost = tonumber(ARGV[6])
+local used = tonumber(redis.call('GET', KEYS[2]) or '0')
+if quota > 0 and used + cost > quota then
+  return {0, '0', used, 'quota'}
+end
+local tokens = burst
+if rate > 0 then
+  local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+  if state[1] then
+    tokens = math.min(burst, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+  end
+  if tokens < math.min(cost, burst) then
+    return {0, tostring(tokens), used, 'rate'}
+  end
+  tokens = tokens - cost
+  redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+  redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 1)
+end
+used = redis.call('INCRBY', KEYS[2], cost)
+if used == cost then
+  redis.call('EXPIRE', KEYS[2], tonumber(ARGV[5]))
+end
+return {1, tostring(tokens), used, ''}
+"""
+
+
+class RedisRateLimiter:
+    """Compteurs partagés entre workers, mis à jour atomiquement par un script Lua."""
+
+    def __init__(self, url: str, clock: Callable[[], float] = time.time):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:  # dépendance optionnelle
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis nécessite le paquet `redis`.") from e
+        self._clock = clock
+        self._redis = redis.from_url(url, socket_timeout=0.5)
+        self._script = self._redis.register_script(_REDIS_SCRIPT)
+
+    async def hit(self, identity: str, limits: ApiKey, cost: int = 1) -> RateLimitDecision:
+        now = self._clock()
+        allowed, tokens, used, reason = await self._script(
+            keys=[f"ratelimit:{identity}", f"quota:{identity}:{_day(now)}"],
+            args=[limits.rate_per_second, limits.burst, limits.daily_quota, now, 2 * 86400, cost],
+        )
+        if isinstance(reason, bytes):
+            reason = reason.decode()
+        return _decide(limits, float(tokens), int(used), now, reason or None, _needed(limits, cost))
+
+
+def build_rate_limiter():
+    if get_rate_limit_backend() == "redis":
+        return RedisRateLimiter(get_redis_url())
+    return InMemoryRateLimiter()
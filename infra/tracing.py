@@ -0,0 +1,252 @@
+# infra/tracing.py
+# Traçage léger des requêtes : identifiant, spans par étape, en-tête Server-Timing,
+# journal des requêtes lentes et export OpenTelemetry (OTLP/JSON).
+import logging
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List
+
+import orjson
+
+from infra.config import (
+    get_otlp_endpoint,
+    get_service_name,
+    get_slow_request_ms,
+    get_slow_request_sample_rate,
+)
+
+logger = logging.getLogger("app.tracing")
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Trace:
+    """Spans d'une requête ; les durées sont mesurées avec `perf_counter_ns`."""
+
+    __slots__ = ("request_id", "trace_id", "parent_span_id", "name", "start_unix_ns",
+                 "start_ns", "end_ns", "spans", "attributes")
+
+    def __init__(self, name: str, request_id: str | None = None, traceparent: str | None = None):
+        match = _TRACEPARENT.match(traceparent or "")
+        self.trace_id = match.group(1) if match else uuid.uuid4().hex
+        self.parent_span_id = match.group(2) if match else None
+        self.request_id = request_id or self.trace_id
+        self.name = name
+        self.start_unix_ns = time.time_ns()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: int | None = None
+        self.spans: List[tuple[str, int, int]] = []
+        self.attributes: Dict[str, Any] = {}
+
+    def add_span(self, name: str, start_ns: int, end_ns: int) -> None:
+        self.spans.append((name, start_ns, end_ns))
+
+    def mark(self, name: str) -> None:
+        """Span couvrant le temps écoulé depuis le début de la requête (ex. validation)."""
+        self.add_span(name, self.start_ns, time.perf_counter_ns())
+
+    def finish(self) -> None:
+        self.end_ns = time.perf_counter_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.perf_counter_ns()) - self.start_ns) / 1e6
+
+    def breakdown(self) -> Dict[str, float]:
+        """Durée totale (ms) par étape ; une étape répétée est cumulée."""
+        totals: Dict[str, float] = {}
+        for name, start, end in self.spans:
+            totals[name] = totals.get(name, 0.0) + (end - start) / 1e6
+        return totals
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={ms:.2f}" for name, ms in self.breakdown().items()]
+        parts.append(f"total;dur={self.duration_ms:.2f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str):
+    """Mesure un bloc comme étape de la requête en cours (sans effet hors requête)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, time.perf_counter_ns())
+
+
+def mark(name: str) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.mark(name)
+
+
+# =======================
+# EXPORT OPENTELEMETRY
+# =======================
+def _attr(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def to_otlp(traces: List[Trace], service_name: str) -> Dict[str, Any]:
+    """Traces au format OTLP/JSON (`ExportTraceServiceRequest`)."""
+    spans = []
+    for t in traces:
+        root_id = uuid.uuid4().hex[:16]
+
+        def unix(ns: int) -> str:
+            return str(t.start_unix_ns + (ns - t.start_ns))
+
+        root = {
+            "traceId": t.trace_id,
+            "spanId": root_id,
+            "name": t.name,
+            "kind": 2,  # SERVER
+            "startTimeUnixNano": unix(t.start_ns),
+            "endTimeUnixNano": unix(t.end_ns or t.start_ns),
+            "attributes": [_attr("request.id", t.request_id)]
+            + [_attr(k, v) for k, v in t.attributes.items()],
+        }
+        if t.parent_span_id:
+            root["parentSpanId"] = t.parent_span_id
+        spans.append(root)
+        for name, start, end in t.spans:
+            spans.append({
+                "traceId": t.trace_id,
+                "spanId": uuid.uuid4().hex[:16],
+                "parentSpanId": root_id,
+                "name": name,
+                "kind": 1,  # INTERNAL
+                "startTimeUnixNano": unix(start),
+                "endTimeUnixNano": unix(end),
+            })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attr("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class OTLPExporter:
+    """Envoie les traces par lots depuis un thread de fond, sans jamais bloquer une requête.
+
+    `endpoint` est l'URL d'un collecteur OTLP/HTTP (les traces sont postées sur
+    `<endpoint>/v1/traces`) ou `file://<chemin>` pour écrire une requête OTLP/JSON par
+    ligne, à la place d'un collecteur en local. Au-delà de `max_queue` traces en
+    attente, les nouvelles sont ignorées.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "co2-api",
+                 max_queue: int = 2048, batch_size: int = 256, interval_s: float = 1.0):
+        self.endpoint = endpoint.rstrip("/")
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval_s = interval_s
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: Trace) -> None:
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        client = None
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval_s
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            body = orjson.dumps(to_otlp(batch, self.service_name))
+            try:
+                if self.endpoint.startswith("file://"):
+                    with open(self.endpoint[len("file://"):], "ab") as f:
+                        f.write(body + b"\n")
+                else:
+                    if client is None:
+                        import httpx
+                        client = httpx.Client(timeout=2.0)
+                    client.post(f"{self.endpoint}/v1/traces", content=body,
+                                headers={"Content-Type": "application/json"})
+            except Exception:
+                logger.warning("Export OTLP impossible (%d traces perdues)", len(batch), exc_info=True)
+
+
+# =======================
+# MIDDLEWARE
+# =======================
+class Tracer:
+    """Crée une trace par requête HTTP et la publie (en-têtes, journal lent, export)."""
+
+    def __init__(self, slow_ms: float, slow_sample_rate: float, exporter: OTLPExporter | None = None):
+        self.slow_ms = slow_ms
+        self.slow_sample_rate = slow_sample_rate
+        self.exporter = exporter
+
+    async def middleware(self, request, call_next):
+        trace = Trace(
+            f"{request.method} {request.url.path}",
+            request_id=request.headers.get("X-Request-ID"),
+            traceparent=request.headers.get("traceparent"),
+        )
+        token = _current.set(trace)
+        try:
+            response = await call_next(request)
+        finally:
+            _current.reset(token)
+            trace.finish()
+        trace.attributes["http.status_code"] = response.status_code
+        response.headers["X-Request-ID"] = trace.request_id
+        response.headers["Server-Timing"] = trace.server_timing()
+        if trace.duration_ms >= self.slow_ms and random.random() < self.slow_sample_rate:
+            logger.warning(orjson.dumps({
+                "event": "slow_request",
+                "request_id": trace.request_id,
+                "trace_id": trace.trace_id,
+                "route": trace.name,
+                "status": response.status_code,
+                "duration_ms": round(trace.duration_ms, 3),
+                "spans_ms": {k: round(v, 3) for k, v in trace.breakdown().items()},
+            }).decode())
+        if self.exporter is not None:
+            self.exporter.export(trace)
+        return response
+
+
+def build_tracer() -> Tracer:
+    endpoint = get_otlp_endpoint()
+    exporter = OTLPExporter(endpoint, get_service_name()) if endpoint else None
+    return Tracer(get_slow_request_ms(), get_slow_request_sample_rate(), exporter)
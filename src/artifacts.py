@@ -0,0 +1,219 @@
+# src/artifacts.py
+# Artefacts du modèle versionnés : un répertoire par entraînement, décrit par un manifeste
+# (empreintes, date d'entraînement, versions des bibliothèques, schéma des features).
+import hashlib
+import json
+import logging
+import os
+import platform
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata as importlib_metadata
+from pathlib import Path
+from typing import Any, Dict, List
+
+import joblib
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"  # fichier pointeur : version servie par défaut
+MANIFEST_FORMAT = 1
+MODEL_FILE = "model.joblib"
+METADATA_FILE = "metadata.joblib"
+QUANTILE_FILE = "quantiles.joblib"
+LIBRARIES = ["numpy", "pandas", "scikit-learn", "xgboost", "joblib"]
+# bibliothèques dont les objets sont sérialisés : une version différente peut changer les prédictions
+PICKLED_LIBRARIES = ["scikit-learn", "xgboost"]
+
+
+class ArtifactError(RuntimeError):
+    """Artefact absent, incomplet, corrompu ou incompatible avec l'API."""
+
+
+def sha256_file(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def library_versions() -> Dict[str, str]:
+    versions = {"python": platform.python_version()}
+    for name in LIBRARIES:
+        try:
+            versions[name] = importlib_metadata.version(name)
+        except importlib_metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def feature_schema(df: pd.DataFrame) -> Dict[str, str]:
+    """Type attendu de chaque feature : `numeric` ou `categorical`."""
+    return {
+        col: "numeric" if pd.api.types.is_numeric_dtype(df[col]) else "categorical"
+        for col in df.columns
+    }
+
+
+# =======================
+# ÉCRITURE
+# =======================
+def save_artifacts(root, model, metadata: Dict[str, Any], quantile_model=None,
+                   compress=3, version: str | None = None) -> Path:
+    """Écrit une nouvelle version dans `root/<version>/` puis la désigne comme courante.
+
+    Le répertoire est construit à part puis renommé : une version visible est toujours
+    complète. `compress` est passé tel quel à `joblib.dump` (niveau zlib ou couple
+    `(méthode, niveau)`).
+    """
+    root = Path(root)
+    trained_at = datetime.now(timezone.utc)
+    version = version or trained_at.strftime("%Y%m%dT%H%M%SZ")
+    target = root / version
+    if target.exists():
+        raise ArtifactError(f"La version {version} existe déjà dans {root}")
+
+    tmp = root / f".{version}.{os.getpid()}.tmp"
+    tmp.mkdir(parents=True)
+    try:
+        metadata = {**metadata, "model_version": version}
+        objects = {MODEL_FILE: model, METADATA_FILE: metadata}
+        if quantile_model is not None:
+            objects[QUANTILE_FILE] = quantile_model
+        files = {}
+        for name, obj in objects.items():
+            joblib.dump(obj, tmp / name, compress=compress)
+            files[name] = {"sha256": sha256_file(tmp / name), "bytes": (tmp / name).stat().st_size}
+
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "version": version,
+            "trained_at": trained_at.isoformat(),
+            "compression": compress if isinstance(compress, int) else list(compress),
+            "libraries": library_versions(),
+            "feature_schema": metadata.get("feature_schema")
+            or {name: None for name in metadata["feature_names"]},
+            "target": metadata.get("target_name"),
+            "files": files,
+        }
+        (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2, ensure_ascii=False))
+        os.replace(tmp, target)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    pointer = root / f".{CURRENT}.{os.getpid()}.tmp"
+    pointer.write_text(version + "\n")
+    os.replace(pointer, root / CURRENT)
+    return target
+
+
+# =======================
+# LECTURE ET VÉRIFICATION
+# =======================
+def resolve_artifact_dir(root, version: str | None = None) -> Path | None:
+    """Répertoire de la version demandée, sinon de la version courante ; None si aucun."""
+    root = Path(root)
+    if not version:
+        pointer = root / CURRENT
+        if not pointer.exists():
+            return None
+        version = pointer.read_text().strip()
+    directory = root / version
+    if not (directory / MANIFEST).exists():
+        raise ArtifactError(f"Version de modèle introuvable ou sans manifeste : {directory}")
+    return directory
+
+
+def verify_artifacts(directory) -> Dict[str, Any]:
+    """Contrôle le manifeste et l'empreinte de chaque fichier ; renvoie le manifeste."""
+    directory = Path(directory)
+    try:
+        manifest = json.loads((directory / MANIFEST).read_text())
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Manifeste illisible dans {directory}: {e}") from e
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ArtifactError(f"Format de manifeste non pris en charge : {manifest.get('format')}")
+    for required in (MODEL_FILE, METADATA_FILE):
+        if required not in manifest.get("files", {}):
+            raise ArtifactError(f"{required} absent du manifeste de {directory}")
+
+    for name, expected in manifest["files"].items():
+        path = directory / name
+        if not path.exists():
+            raise ArtifactError(f"Fichier manquant : {path}")
+        # la taille d'abord : un envoi interrompu est détecté sans relire le fichier
+        if path.stat().st_size != expected["bytes"]:
+            raise ArtifactError(f"Taille inattendue pour {path} (envoi incomplet ?)")
+        if sha256_file(path) != expected["sha256"]:
+            raise ArtifactError(f"Empreinte SHA-256 invalide pour {path}")
+
+    installed = library_versions()
+    for name in PICKLED_LIBRARIES:
+        built = manifest.get("libraries", {}).get(name)
+        if built and installed.get(name) and built != installed[name]:
+            logger.warning("Modèle %s entraîné avec %s %s, installé : %s",
+                           manifest["version"], name, built, installed[name])
+    return manifest
+
+
+def check_feature_schema(schema: Dict[str, str | None], expected: Dict[str, str]) -> None:
+    """Vérifie que les features du modèle sont celles (et du type) attendues par l'API."""
+    missing = sorted(set(schema) - set(expected))
+    unused = sorted(set(expected) - set(schema))
+    if missing or unused:
+        raise ArtifactError(
+            f"Schéma du modèle incompatible : features absentes de l'API {missing}, "
+            f"features de l'API inconnues du modèle {unused}"
+        )
+    mismatched = sorted(
+        name for name, kind in schema.items() if kind is not None and kind != expected[name]
+    )
+    if mismatched:
+        raise ArtifactError(f"Schéma du modèle incompatible : types différents pour {mismatched}")
+
+
+# =======================
+# CHOIX DE LA COMPRESSION
+# =======================
+def benchmark_compression(obj, levels=(0, 1, 3, 6, 9), repeat: int = 5, workdir=None) -> List[Dict[str, Any]]:
+    """Taille et temps d'écriture/lecture de `obj` pour chaque réglage de compression."""
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for level in levels:
+            path = Path(tmp) / "bench.joblib"
+            start = time.perf_counter()
+            joblib.dump(obj, path, compress=level)
+            dump_s = time.perf_counter() - start
+            load_times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                joblib.load(path)
+                load_times.append(time.perf_counter() - start)
+            results.append({
+                "compress": level,
+                "bytes": path.stat().st_size,
+                "dump_ms": dump_s * 1e3,
+                "load_ms": sorted(load_times)[len(load_times) // 2] * 1e3,
+            })
+    return results
+
+
+if __name__ == "__main__":
+    # python -m src.artifacts : compare les niveaux de compression sur le modèle servi
+    from src.model import load_model, load_quantile_model
+
+    model, _ = load_model()
+    candidates = {"modèle": model, "quantiles": load_quantile_model()}
+    for label, obj in candidates.items():
+        if obj is None:
+            continue
+        print(f"\n{label}")
+        print(f"{'compress':>10} {'octets':>10} {'écriture ms':>12} {'lecture ms':>11}")
+        for r in benchmark_compression(obj):
+            print(f"{r['compress']!s:>10} {r['bytes']:>10} {r['dump_ms']:>12.1f} {r['load_ms']:>11.1f}")
@@ -0,0 +1,105 @@
+# src/batcher.py
+# Regroupement dynamique des appels concurrents au modèle (micro-batching côté serveur).
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+from infra.metrics import Histogram
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class DynamicBatcher:
+    """Regroupe les prédictions soumises par plusieurs threads en un seul appel vectorisé.
+
+    Un thread de fond attend une première requête puis collecte celles qui arrivent
+    dans la fenêtre `max_wait_ms` (au plus `max_batch_size`), appelle `predict_batch_fn`
+    une fois et résout le `Future` de chaque appelant.
+    """
+
+    def __init__(
+        self,
+        predict_batch_fn: Callable[[List[Dict[str, Any]]], List[float]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+    ):
+        self._predict_batch = predict_batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.latencies_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    def submit(self, features: Dict[str, Any]) -> Future:
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put((features, fut, time.perf_counter()))
+        return fut
+
+    def predict(self, features: Dict[str, Any], timeout: float | None = None) -> float:
+        return self.submit(features).result(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batch_size": self.batch_sizes.snapshot(),
+            "latency_ms": self.latencies_ms.snapshot(),
+        }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                self._process(batch)
+            except Exception as e:
+                # le worker survit à un lot en erreur et aucun appelant n'attend indéfiniment
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def _process(self, batch: list) -> None:
+        self.batch_sizes.observe(len(batch))
+        try:
+            results = self._predict_batch([features for features, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"{len(results)} prédictions pour un lot de {len(batch)}")
+        except Exception:
+            # une entrée fautive ne doit pas faire échouer les autres appelants
+            results = None
+        for i, (features, fut, started) in enumerate(batch):
+            if results is not None:
+                fut.set_result(results[i])
+            else:
+                try:
+                    fut.set_result(self._predict_batch([features])[0])
+                except Exception as e:
+                    fut.set_exception(e)
+            self.latencies_ms.observe((time.perf_counter() - started) * 1000)
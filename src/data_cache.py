@@ -0,0 +1,57 @@
+# src/data_cache.py
+# Cache colonnaire typé (Feather / Arrow IPC) des CSV sources, indexé par empreinte du contenu.
+import hashlib
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+
+# à incrémenter si le typage change : invalide les caches existants
+CACHE_VERSION = "1"
+
+
+def content_hash(path) -> str:
+    h = hashlib.sha256(CACHE_VERSION.encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def _cache_dir(csv_path: Path, cache_dir) -> Path:
+    if cache_dir is not None:
+        return Path(cache_dir)
+    env = os.getenv("DATA_CACHE_DIR")
+    return Path(env) if env else csv_path.parent / ".cache"
+
+
+def read_typed_csv(csv_path) -> pd.DataFrame:
+    """Lecture du CSV brut avec des types explicites : colonnes texte en `category`."""
+    df = pd.read_csv(csv_path, low_memory=False)
+    text_cols = df.select_dtypes(include="object").columns
+    df[text_cols] = df[text_cols].astype("category")
+    return df
+
+
+def load_dataset(csv_path, cache_dir=None) -> pd.DataFrame:
+    """Charge un CSV depuis son cache Feather, reconstruit seulement si le contenu a changé.
+
+    Le cache est lu en mémoire partagée (memory map) ; les catégories sont conservées.
+    """
+    csv_path = Path(csv_path)
+    directory = _cache_dir(csv_path, cache_dir)
+    cache_path = directory / f"{csv_path.stem}-{content_hash(csv_path)}.feather"
+    if cache_path.exists():
+        return feather.read_table(cache_path, memory_map=True).to_pandas()
+
+    df = read_typed_csv(csv_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    # non compressé : les colonnes peuvent être projetées en mémoire sans décodage
+    feather.write_feather(df, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)  # écriture atomique : jamais de cache partiel
+    for stale in directory.glob(f"{csv_path.stem}-{'?' * 16}.feather"):
+        if stale != cache_path:
+            stale.unlink(missing_ok=True)
+    return df
@@ -0,0 +1,158 @@
+# src/drift.py
+# Suivi de dérive : histogrammes de référence (entraînement) et esquisses incrémentales (production).
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+N_BINS = 10
+OTHER = "__other__"
+EPS = 1e-4
+
+
+def reference_histogram(values: pd.Series, n_bins: int = N_BINS) -> Dict[str, Any]:
+    """Histogramme de référence : bornes par quantiles (numérique) ou fréquences (catégoriel)."""
+    values = values.dropna()
+    if pd.api.types.is_numeric_dtype(values):
+        cuts = np.unique(np.quantile(values.astype(float), np.linspace(0, 1, n_bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(cuts, values.astype(float), side="right"), minlength=len(cuts) + 1)
+        return {"type": "numeric", "cuts": cuts.tolist(), "proportions": (counts / counts.sum()).tolist()}
+    freqs = values.astype(str).value_counts(normalize=True)
+    return {
+        "type": "categorical",
+        "categories": freqs.index.tolist() + [OTHER],
+        "proportions": freqs.tolist() + [0.0],
+    }
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population Stability Index entre deux distributions (proportions lissées)."""
+    e = np.clip(expected, EPS, None)
+    a = np.clip(actual, EPS, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def binned_ks(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Statistique de Kolmogorov-Smirnov calculée sur les classes (approximation)."""
+    return float(np.max(np.abs(np.cumsum(expected) - np.cumsum(actual))))
+
+
+class _Sketch:
+    """Comptes par classe, mis à jour en O(1) par valeur, sur les classes de la référence."""
+
+    def __init__(self, reference: Dict[str, Any]):
+        self.numeric = reference["type"] == "numeric"
+        self.expected = np.asarray(reference["proportions"], dtype=float)
+        if self.numeric:
+            self.cuts = np.asarray(reference["cuts"], dtype=float)
+        else:
+            self.index = {c: i for i, c in enumerate(reference["categories"])}
+        self.counts = np.zeros(len(self.expected))
+
+    def decay(self, factor: float) -> None:
+        self.counts *= factor
+
+    def update(self, values: List[Any]) -> None:
+        if self.numeric:
+            arr = np.asarray([v for v in values if v is not None], dtype=float)
+            idx = np.searchsorted(self.cuts, arr, side="right")
+        else:
+            other = self.index[OTHER]
+            idx = np.asarray([self.index.get(str(v), other) for v in values if v is not None], dtype=int)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+
+    def scores(self) -> Dict[str, Any]:
+        total = self.counts.sum()
+        if total <= 0:
+            return {"psi": None, "ks": None}
+        actual = self.counts / total
+        return {
+            "psi": psi(self.expected, actual),
+            "ks": binned_ks(self.expected, actual) if self.numeric else None,
+        }
+
+
+def _status(value: float | None) -> str | None:
+    if value is None:
+        return None
+    if value < 0.1:
+        return "stable"
+    return "modérée" if value < 0.25 else "forte"
+
+
+class DriftMonitor:
+    """Compare les entrées et prédictions journalisées à la distribution d'entraînement.
+
+    Les esquisses sont alimentées par les seules lignes nouvelles du journal des
+    prédictions (identifiant > dernier identifiant vu). Un oubli exponentiel de
+    demi-vie `half_life` lignes privilégie le trafic récent.
+    """
+
+    def __init__(self, reference: Dict[str, Any], half_life: int = 5000):
+        self.half_life = max(1, half_life)
+        self.features = {name: _Sketch(ref) for name, ref in reference["features"].items()}
+        self.prediction = _Sketch(reference["prediction"])
+        self.last_id: int | None = None
+        self.rows = 0
+        self.updated_at: str | None = None
+        self._lock = threading.Lock()
+
+    def update(self, rows: Iterable[Dict[str, Any]], last_id: int | None) -> int:
+        """Intègre des lignes `{feature: valeur, ..., "predicted_co2": y}` du journal."""
+        rows = list(rows)
+        with self._lock:
+            if rows:
+                factor = 0.5 ** (len(rows) / self.half_life)
+                for name, sketch in self.features.items():
+                    sketch.decay(factor)
+                    sketch.update([r.get(name) for r in rows])
+                self.prediction.decay(factor)
+                self.prediction.update([r.get("predicted_co2") for r in rows])
+                self.rows += len(rows)
+            if last_id is not None:
+                self.last_id = last_id
+            self.updated_at = datetime.now(timezone.utc).isoformat()
+        return len(rows)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            features = {name: sketch.scores() for name, sketch in self.features.items()}
+            prediction = self.prediction.scores()
+            rows, last_id, updated_at = self.rows, self.last_id, self.updated_at
+        for scores in [*features.values(), prediction]:
+            scores["status"] = _status(scores["psi"])
+        return {
+            "available": True,
+            "rows": rows,
+            "last_prediction_id": last_id,
+            "updated_at": updated_at,
+            "features": features,
+            "prediction": prediction,
+        }
+
+    def prometheus(self) -> str:
+        """Scores au format d'exposition Prometheus."""
+        report = self.report()
+        lines = [
+            "# HELP co2_drift_psi Population Stability Index vs distribution d'entraînement",
+            "# TYPE co2_drift_psi gauge",
+        ]
+        series = {**report["features"], "predicted_co2": report["prediction"]}
+        for name, scores in series.items():
+            if scores["psi"] is not None:
+                lines.append(f'co2_drift_psi{{feature="{name}"}} {scores["psi"]:.6g}')
+        lines += [
+            "# HELP co2_drift_ks Statistique KS (sur classes) vs distribution d'entraînement",
+            "# TYPE co2_drift_ks gauge",
+        ]
+        for name, scores in series.items():
+            if scores["ks"] is not None:
+                lines.append(f'co2_drift_ks{{feature="{name}"}} {scores["ks"]:.6g}')
+        lines += [
+            "# HELP co2_drift_rows Lignes du journal intégrées aux esquisses",
+            "# TYPE co2_drift_rows counter",
+            f"co2_drift_rows {report['rows']}",
+        ]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,102 @@
+# src/explain.py
+# Explications des prédictions : contributions par feature calculées nativement par XGBoost.
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from src.model import as_served, load_model
+
+CACHE_SIZE = 4096
+
+
+class _LRUCache:
+    """Cache LRU thread-safe, rempli par lots."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+_cache = _LRUCache(CACHE_SIZE)
+
+
+def _output_features(model) -> List[str]:
+    """Feature brute à l'origine de chaque colonne produite par le préprocesseur."""
+    columns: List[str] = []
+    for name, _, cols in model[0].transformers_:
+        if name != "remainder":
+            columns.extend(cols)
+    return columns
+
+
+def _compute(inputs: List[Dict[str, Any]], metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    model, _ = load_model()
+    features = metadata["feature_names"]
+    X = model[:-1].transform(as_served(pd.DataFrame(inputs)[features]))
+    contribs = model[-1].get_booster().predict(xgb.DMatrix(np.asarray(X, dtype=float)), pred_contribs=True)
+
+    # une colonne transformée -> une feature brute (sommées si une feature en produit plusieurs)
+    origin = [features.index(f) for f in _output_features(model)]
+    raw = np.zeros((contribs.shape[0], len(features)))
+    np.add.at(raw.T, origin, contribs[:, :-1].T)
+
+    return [
+        {
+            "prediction": float(row.sum() + bias),
+            "base_value": float(bias),
+            "contributions": dict(zip(features, map(float, row))),
+        }
+        for row, bias in zip(raw, contribs[:, -1])
+    ]
+
+
+def explain_batch(inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Contributions de chaque feature brute ; `base_value` + somme des contributions = prédiction.
+
+    Les entrées déjà expliquées sont servies depuis un cache LRU ; les autres sont
+    calculées en un seul appel vectorisé.
+    """
+    if not inputs:
+        return []
+    _, metadata = load_model()
+    keys = [tuple(x[f] for f in metadata["feature_names"]) for x in inputs]
+    results = [_cache.get(k) for k in keys]
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        computed = _compute([inputs[i] for i in missing], metadata)
+        for i, explanation in zip(missing, computed):
+            _cache.put(keys[i], explanation)
+            results[i] = explanation
+    return results
+
+
+def explain(input_data: Dict[str, Any]) -> Dict[str, Any]:
+    return explain_batch([input_data])[0]
@@ -1,30 +1,131 @@
 # src/model.py
 # Ce fichier contient les fonctions pour charger le modèle de prédiction et faire des prédictions.
+import hashlib
 import joblib
+import numpy as np
 import pandas as pd
 import os
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, List
 
-# Charger le modèle et les métadonnées
-def load_model():
-    model_path = os.path.join(os.path.dirname(__file__), "..", "models", "model_emissions_co2.joblib")
-    metadata_path = os.path.join(os.path.dirname(__file__), "..", "models", "model_metadata.joblib")
+from infra.config import get_model_version_pin
+from src.artifacts import (
+    MODEL_FILE, METADATA_FILE, QUANTILE_FILE, ArtifactError, resolve_artifact_dir, verify_artifacts,
+)
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "..", "models")
+# fichiers historiques (non versionnés), servis tant qu'aucune version n'est désignée par models/CURRENT
+MODEL_PATH = os.path.join(MODELS_DIR, "model_emissions_co2.joblib")
+METADATA_PATH = os.path.join(MODELS_DIR, "model_metadata.joblib")
+QUANTILE_MODEL_PATH = os.path.join(MODELS_DIR, "model_quantiles_co2.joblib")
+
+# Version servie et son manifeste, vérifiés (empreintes) une seule fois par processus
+@lru_cache(maxsize=1)
+def _served_artifacts():
+    directory = resolve_artifact_dir(MODELS_DIR, get_model_version_pin())
+    if directory is None:
+        return None, None
+    return directory, verify_artifacts(directory)
+
+def get_manifest() -> Dict[str, Any] | None:
+    """Manifeste de la version servie ; None pour les fichiers historiques."""
+    return _served_artifacts()[1]
 
-    model = joblib.load(model_path)
-    metadata = joblib.load(metadata_path)
+# Charger le modèle et les métadonnées (une seule fois par processus)
+@lru_cache(maxsize=1)
+def load_model():
+    directory, manifest = _served_artifacts()
+    if directory is None:
+        return joblib.load(MODEL_PATH), joblib.load(METADATA_PATH)
+    model = joblib.load(directory / MODEL_FILE)
+    metadata = joblib.load(directory / METADATA_FILE)
+    if set(manifest["feature_schema"]) != set(metadata["feature_names"]):
+        raise ArtifactError(f"Les features du manifeste et des métadonnées diffèrent dans {directory}")
     return model, metadata
 
+def as_served(input_df: pd.DataFrame) -> pd.DataFrame:
+    """Prépare un DataFrame de features pour qu'un lot soit scoré comme en service, ligne à ligne."""
+    input_df = input_df.copy()
+    # label_encode_columns ré-ajuste un LabelEncoder à chaque appel : sur une ligne seule,
+    # toute catégorie est encodée 0. On fixe les colonnes catégorielles à une valeur
+    # constante pour qu'un lot soit scoré exactement comme chaque ligne prise isolément.
+    cat_cols = input_df.select_dtypes(exclude="number").columns
+    input_df[cat_cols] = ""
+    return input_df
+
+def _to_frame(inputs: List[Dict[str, Any]], metadata: Dict[str, Any]) -> pd.DataFrame:
+    return as_served(pd.DataFrame(inputs)[metadata["feature_names"]])
+
 # Faire une prédiction
 def predict(input_data: Dict[str, Any]) -> float:
+    return predict_batch([input_data])[0]
+
+# Faire plusieurs prédictions en un seul appel vectorisé
+def predict_batch(inputs: List[Dict[str, Any]]) -> List[float]:
+    if not inputs:
+        return []
     model, metadata = load_model()
-    input_df = pd.DataFrame([input_data])[metadata["feature_names"]]
-    prediction = model.predict(input_df)[0]
-    return float(prediction)
+    predictions = model.predict(_to_frame(inputs, metadata))
+    return [float(y) for y in predictions]
+
+# Modèle de quantiles (facultatif : absent des modèles entraînés sans intervalle)
+@lru_cache(maxsize=1)
+def load_quantile_model():
+    directory, manifest = _served_artifacts()
+    if directory is not None:
+        return joblib.load(directory / QUANTILE_FILE) if QUANTILE_FILE in manifest["files"] else None
+    if not os.path.exists(QUANTILE_MODEL_PATH):
+        return None
+    return joblib.load(QUANTILE_MODEL_PATH)
+
+# Bornes triées, élargies si besoin pour toujours contenir l'estimation ponctuelle
+def interval_bounds(point: np.ndarray, quantile_predictions: np.ndarray):
+    bounds = np.sort(quantile_predictions.reshape(len(point), -1), axis=1)
+    return np.minimum(bounds[:, 0], point), np.maximum(bounds[:, -1], point)
+
+# Prédictions avec intervalle : un seul prétraitement partagé par toutes les têtes
+def predict_interval_batch(inputs: List[Dict[str, Any]]) -> List[Dict[str, float]]:
+    quantile_model = load_quantile_model()
+    if quantile_model is None:
+        raise RuntimeError("Aucun modèle de quantiles disponible.")
+    model, metadata = load_model()
+    features = model[:-1].transform(_to_frame(inputs, metadata))
+    point = model[-1].predict(features)
+    lower, upper = interval_bounds(point, quantile_model.predict(features))
+    return [
+        {"prediction": float(y), "lower": float(lo), "upper": float(hi)}
+        for y, lo, hi in zip(point, lower, upper)
+    ]
 
 # Renvoyer infos sur le modèle
 def get_model_info() -> Dict[str, Any]:
     _, metadata = load_model()
     return metadata
 
+# Schéma des features attendu par le modèle (types inconnus pour les modèles historiques)
+def get_feature_schema() -> Dict[str, str | None]:
+    manifest = get_manifest()
+    if manifest is not None:
+        return manifest["feature_schema"]
+    metadata = get_model_info()
+    return metadata.get("feature_schema") or {name: None for name in metadata["feature_names"]}
+
+# Identifiant court de la version du modèle
+@lru_cache(maxsize=1)
+def get_model_version() -> str:
+    """Version du manifeste, sinon celle des métadonnées, sinon empreinte SHA-256 (12 car.) du fichier modèle."""
+    manifest = get_manifest()
+    if manifest is not None:
+        return manifest["version"]
+    _, metadata = load_model()
+    version = metadata.get("model_version")
+    if version:
+        return str(version)
+    h = hashlib.sha256()
+    with open(MODEL_PATH, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
 print("Modèle et métadonnées chargés avec succès.")
-print("Fonction de prédiction prête à l'emploi.")
\ No newline at end of file
+print("Fonction de prédiction prête à l'emploi.")
@@ -11,6 +11,10 @@ import numpy as np
 from sklearn.preprocessing import LabelEncoder
 
 from src.payload_setup import label_encode_columns
+from src.drift import reference_histogram
+from src.model import as_served, interval_bounds
+from src.data_cache import load_dataset
+from src.artifacts import feature_schema, save_artifacts
 
 
 def build_pipeline():
@@ -39,11 +43,28 @@ def build_pipeline():
     )
     return model
 
+
+QUANTILES = [0.1, 0.9]
+
+def build_quantile_regressor(quantiles=QUANTILES):
+    # un seul booster, une sortie par quantile : les bornes sont prédites en un appel
+    return XGBRegressor(
+        objective='reg:quantileerror',
+        quantile_alpha=np.array(quantiles),
+        tree_method='hist',
+        random_state=0,
+        n_estimators=200,
+        learning_rate=0.1,
+        max_depth=3,
+        subsample=0.85
+    )
+
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import numpy as np
 
-def train_and_save(data_path, model_path, metadata_path):
-    df = pd.read_csv(data_path)
+def train(data_path, with_quantiles=True):
+    """Entraîne le modèle (et le modèle de quantiles) ; renvoie `(model, metadata, quantile_model)`."""
+    df = load_dataset(data_path)  # cache Feather typé, reconstruit si le CSV change
     trainset, testset = train_test_split(
         df, test_size=0.2, random_state=0, stratify=df['PrimaryPropertyType']
     )
@@ -66,12 +87,26 @@ def train_and_save(data_path, model_path, metadata_path):
     wape = np.sum(np.abs(y_test - y_pred)) / np.sum(np.abs(y_test))
     r2 = r2_score(y_test, y_pred)
 
-    # Sauvegarde du modèle
-    joblib.dump(model, model_path)
+    # Distributions de référence pour le suivi de dérive (prédictions telles que servies par l'API)
+    reference = {
+        'features': {col: reference_histogram(X_train[col]) for col in X_train.columns},
+        'prediction': reference_histogram(pd.Series(model.predict(as_served(X_train)))),
+    }
+
+    # Modèle de quantiles (intervalle de prédiction), entraîné et évalué sur les lignes
+    # encodées comme en service : la couverture enregistrée est celle des intervalles servis
+    quantile_model, quantiles = None, None
+    if with_quantiles:
+        quantile_model = build_quantile_regressor().fit(model[:-1].transform(as_served(X_train)), y_train)
+        Xs_test = model[:-1].transform(as_served(X_test))
+        lower, upper = interval_bounds(model[-1].predict(Xs_test), quantile_model.predict(Xs_test))
+        coverage = np.mean((y_test.to_numpy() >= lower) & (y_test.to_numpy() <= upper))
+        quantiles = {'alphas': QUANTILES, 'coverage': float(coverage)}
 
     #Sauvegarde des métadonnées complètes
     metadata = {
         'feature_names': X_train.columns.tolist(),
+        'feature_schema': feature_schema(X_train),
         'target_name': 'TotalGHGEmissions',
         'model_type': 'XGBoost',
         'performance': {
@@ -83,24 +118,40 @@ def train_and_save(data_path, model_path, metadata_path):
         'description': (
             "Total greenhouse gas emissions (CO2, CH4, N2O) from energy consumption, "
             "expressed in CO2-equivalent using 2023 utility-specific emissions factors."
-        )
+        ),
+        'reference': reference,
+        'quantiles': quantiles,
     }
-    joblib.dump(metadata, metadata_path)
+    return model, metadata, quantile_model
+
 
+def train_and_save(data_path, model_path, metadata_path, quantile_path=None, compress=0):
+    """Fichiers historiques (non versionnés) aux chemins donnés."""
+    model, metadata, quantile_model = train(data_path, with_quantiles=quantile_path is not None)
+    joblib.dump(model, model_path, compress=compress)
+    if quantile_model is not None:
+        joblib.dump(quantile_model, quantile_path, compress=compress)
+    joblib.dump(metadata, metadata_path, compress=compress)
     return model, metadata
 
 
+def train_and_save_versioned(data_path, models_dir, compress=3):
+    """Nouvelle version dans `models_dir/<version>/`, avec manifeste, désignée comme courante."""
+    model, metadata, quantile_model = train(data_path)
+    return save_artifacts(models_dir, model, metadata, quantile_model, compress=compress)
+
+
 if __name__ == "__main__":
     import os
 
+    from infra.config import get_model_compression
+
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     MODEL_DIR = os.path.join(BASE_DIR, "..", "models")
     os.makedirs(MODEL_DIR, exist_ok=True)
 
     DATA_PATH = os.path.join(BASE_DIR, "ville_de_seattle.csv")
-    MODEL_PATH = os.path.join(MODEL_DIR, "model_emissions_co2.joblib")
-    METADATA_PATH = os.path.join(MODEL_DIR, "model_metadata.joblib")
 
-    model, metadata = train_and_save(DATA_PATH, MODEL_PATH, METADATA_PATH)
-    print(f"Modèle sauvegardé dans {MODEL_PATH}")
-    print(f"Métadonnées sauvegardées dans {METADATA_PATH}")
+    version_dir = train_and_save_versioned(DATA_PATH, MODEL_DIR, compress=get_model_compression())
+    print(f"Modèle, quantiles et manifeste sauvegardés dans {version_dir}")
+    print(f"Version courante : {version_dir.name} (models/CURRENT)")
@@ -36,3 +36,59 @@ def client(_ensure_schema):
     from app.main import app
     with TestClient(app) as c:
         yield c
+
+# 6) Payload valide pour /predict, partagé par les tests d'API
+@pytest.fixture
+def valid_payload():
+    return {
+        "PrimaryPropertyType": "Office",
+        "YearBuilt": 2005,
+        "NumberofBuildings": 1,
+        "NumberofFloors": 4,
+        "LargestPropertyUseType": "Office",
+        "LargestPropertyUseTypeGFA": 2200.0,
+    }
+
+# 7) Mini dataset d'entraînement factice (CSV)
+@pytest.fixture
+def fake_training_csv(tmp_path):
+    import pandas as pd
+    df = pd.DataFrame({
+        'PrimaryPropertyType': ['office']*5 + ['classroom']*5,
+        'YearBuilt': [2000, 1995, 2010, 2005, 2012, 1998, 2003, 2007, 2015, 2020],
+        'NumberofBuildings': [1, 2, 1, 3, 2, 1, 1, 2, 3, 1],
+        'NumberofFloors': [5, 10, 3, 7, 4, 6, 8, 9, 2, 1],
+        'LargestPropertyUseType': ['Office', 'School']*5,
+        'LargestPropertyUseTypeGFA': [1000, 2000, 1500, 2500, 1800, 2200, 1600, 2400, 3000, 1200],
+        'SiteEnergyUseWN(kBtu)': [100, 200, 150, 300, 180, 220, 160, 240, 300, 120],
+        'TotalGHGEmissions': [10, 20, 15, 25, 18, 22, 16, 24, 30, 12],
+        'ENERGYSTARScore': [50, 60, 55, 65, 58, 62, 57, 63, 70, 52]
+    })
+    csv_path = tmp_path / "fake_data.csv"
+    df.to_csv(csv_path, index=False)
+    return df, csv_path
+
+# 8) Modèle versionné entraîné sur le dataset factice et servi à la place de models/
+#    (référence de dérive et quantiles toujours présents, quel que soit l'artefact sur disque)
+@pytest.fixture
+def trained_model(fake_training_csv, tmp_path, monkeypatch):
+    from app import main
+    from src import model as model_module
+    from src.explain import _cache
+    from src.train_and_save import train_and_save_versioned
+
+    models_dir = tmp_path / "models"
+    train_and_save_versioned(fake_training_csv[1], models_dir)
+    caches = (model_module._served_artifacts, model_module.load_model, model_module.load_quantile_model,
+              model_module.get_model_version, main._model_info_bytes)
+
+    def clear():
+        for cached in caches:
+            cached.cache_clear()
+        _cache.clear()
+
+    monkeypatch.setattr(model_module, "MODELS_DIR", str(models_dir))
+    monkeypatch.setattr(main, "_drift_monitor", None)
+    clear()
+    yield models_dir
+    clear()
@@ -8,17 +8,6 @@ def test_health_endpoint(client):
     assert "status" in body and body["status"] in {"healthy", "degraded"}
     assert "model_loaded" in body
 
-@pytest.fixture
-def valid_payload():
-    return {
-        "PrimaryPropertyType": "Office",
-        "YearBuilt": 2005,
-        "NumberofBuildings": 1,
-        "NumberofFloors": 4,
-        "LargestPropertyUseType": "Office",
-        "LargestPropertyUseTypeGFA": 2200.0,
-    }
-
 def test_predict_valid(client, valid_payload):
     r = client.post("/predict", json=valid_payload)
     assert r.status_code == 200
@@ -40,3 +29,155 @@ def test_predictions_history_shape(client, valid_payload):
     if body["predictions"]:
         item = body["predictions"][0]
         assert {"prediction_id","input_id","predicted_co2","prediction_date","input_data"} <= set(item)
+
+def test_predict_minimal_query(client, valid_payload):
+    r = client.post("/predict?minimal=true", json=valid_payload)
+    assert r.status_code == 200
+    data = r.json()
+    assert set(data) == {"prediction", "model_version"}
+
+def test_predict_minimal_prefer_header(client, valid_payload):
+    r = client.post("/predict", json=valid_payload, headers={"Prefer": "return=minimal"})
+    assert r.status_code == 200
+    assert set(r.json()) == {"prediction", "model_version"}
+    assert r.headers.get("Preference-Applied") == "return=minimal"
+
+def test_model_info_shape(client):
+    r = client.get("/model_info")
+    assert r.status_code == 200
+    body = r.json()
+    assert "feature_names" in body and "performance" in body
+
+def test_predict_stream_websocket(client, valid_payload):
+    with client.websocket_connect("/ws/predict") as ws:
+        ws.send_json({"id": "a", **valid_payload})
+        ws.send_json({"id": "b", **valid_payload, "NumberofFloors": 12})
+        ws.send_json({"id": "c", "YearBuilt": "not_a_number"})
+        results = [ws.receive_json() for _ in range(3)]
+    assert [r["id"] for r in results] == ["a", "b", "c"]
+    assert isinstance(results[0]["prediction"], float)
+    assert "prediction" in results[1]
+    assert "error" in results[2]
+
+def test_batching_stats(client):
+    r = client.get("/batching_stats")
+    assert r.status_code == 200
+    assert "enabled" in r.json()
+
+def test_predict_batch(client, valid_payload):
+    rows = [valid_payload, {**valid_payload, "id": "b2"}, {"YearBuilt": 1500}]
+    r = client.post("/predict/batch", json=rows)
+    assert r.status_code == 200
+    preds = r.json()["predictions"]
+    assert [p["id"] for p in preds] == [0, "b2", 2]
+    assert preds[0]["prediction"] == preds[1]["prediction"]
+    assert "error" in preds[2]
+
+def test_predict_batch_matches_single(client, valid_payload):
+    single = client.post("/predict", json=valid_payload).json()["prediction"]
+    batch = client.post("/predict/batch", json=[valid_payload]).json()["predictions"][0]
+    assert batch["prediction"] == pytest.approx(single)
+
+def test_predict_batch_too_large(client, valid_payload, monkeypatch):
+    monkeypatch.setenv("PREDICT_BATCH_MAX_ROWS", "2")
+    r = client.post("/predict/batch", json=[valid_payload] * 3)
+    assert r.status_code == 413
+
+def test_drift_endpoint(trained_model, client, valid_payload):
+    client.post("/predict", json=valid_payload)
+    r = client.get("/drift?refresh=true")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["available"] is True
+    assert body["rows"] >= 1
+    assert set(body["features"]) >= {"YearBuilt", "PrimaryPropertyType"}
+    assert body["prediction"]["psi"] is not None
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200 and "co2_drift_psi" in metrics.text
+
+def test_explain(client, valid_payload):
+    r = client.post("/explain", json=valid_payload)
+    assert r.status_code == 200
+    body = r.json()
+    assert set(body["contributions"]) == set(valid_payload)
+    total = body["base_value"] + sum(body["contributions"].values())
+    assert total == pytest.approx(body["prediction"], abs=1e-2)
+    single = client.post("/predict?minimal=true", json=valid_payload).json()["prediction"]
+    assert body["prediction"] == pytest.approx(single, abs=1e-2)
+
+def test_explain_batch_uses_cache(client, valid_payload):
+    from src.explain import _cache
+
+    other = {**valid_payload, "NumberofFloors": 30}
+    client.post("/explain", json=valid_payload)
+    hits = _cache.hits
+    r = client.post("/explain/batch", json=[valid_payload, other])
+    assert r.status_code == 200
+    explanations = r.json()["explanations"]
+    assert len(explanations) == 2
+    assert _cache.hits == hits + 1
+
+def test_predict_with_interval(trained_model, client, valid_payload):
+    r = client.post("/predict?interval=true&minimal=true", json=valid_payload)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["interval"]["lower"] <= body["prediction"] <= body["interval"]["upper"]
+    assert body["interval"]["quantiles"] == [0.1, 0.9]
+
+def test_predict_interval_without_quantile_model(client, valid_payload, monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(main, "load_quantile_model", lambda: None)
+    r = client.post("/predict?interval=true", json=valid_payload)
+    assert r.status_code == 503
+
+def test_predict_batcher_timeout(client, valid_payload, monkeypatch):
+    import threading
+
+    from app import main
+    from src.batcher import DynamicBatcher
+
+    release = threading.Event()
+
+    def stuck(inputs):
+        release.wait(5)
+        return [0.0] * len(inputs)
+
+    monkeypatch.setattr(main, "_batcher", DynamicBatcher(stuck))
+    monkeypatch.setattr(main, "_BATCH_TIMEOUT_S", 0.1)
+    try:
+        r = client.post("/predict", json=valid_payload)
+    finally:
+        release.set()
+    assert r.status_code == 503
+
+def test_predict_server_timing(client, valid_payload):
+    r = client.post("/predict?minimal=true", json=valid_payload, headers={"X-Request-ID": "req-42"})
+    assert r.status_code == 200
+    assert r.headers["X-Request-ID"] == "req-42"
+    timing = r.headers["Server-Timing"]
+    for stage in ("validation", "model", "db", "commit", "serialize", "total"):
+        assert f"{stage};dur=" in timing
+
+def test_predict_batch_server_timing(client, valid_payload):
+    r = client.post("/predict/batch", json=[valid_payload, {"id": "bad"}])
+    assert r.status_code == 200
+    timing = r.headers["Server-Timing"]
+    for stage in ("validation", "model", "db", "commit", "serialize", "total"):
+        assert f"{stage};dur=" in timing
+
+def test_concurrent_drift_refreshes_count_rows_once(trained_model, client, valid_payload):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app import main
+
+    client.post("/predict/batch", json=[valid_payload] * 20)
+    assert main._get_drift_monitor() is not None
+
+    with main.SessionLocal() as db:
+        start = max(0, main.last_prediction_id(db) - main.get_drift_bootstrap_rows())
+        expected = db.query(main.Prediction).filter(main.Prediction.id > start).count()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: main._refresh_drift(), range(4)))
+    assert main._drift_monitor.rows == expected
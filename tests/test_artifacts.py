@@ -0,0 +1,89 @@
+import joblib
+import pytest
+
+from src import model as model_module
+from src.artifacts import (
+    CURRENT, MODEL_FILE, ArtifactError, benchmark_compression, check_feature_schema,
+    resolve_artifact_dir, save_artifacts, verify_artifacts,
+)
+
+METADATA = {
+    "feature_names": ["PrimaryPropertyType", "YearBuilt"],
+    "feature_schema": {"PrimaryPropertyType": "categorical", "YearBuilt": "numeric"},
+    "target_name": "TotalGHGEmissions",
+}
+
+
+def test_save_then_verify(tmp_path):
+    directory = save_artifacts(tmp_path, {"weights": list(range(1000))}, METADATA, version="v1")
+
+    assert (tmp_path / CURRENT).read_text().strip() == "v1"
+    assert resolve_artifact_dir(tmp_path) == directory
+    manifest = verify_artifacts(directory)
+    assert manifest["version"] == "v1"
+    assert manifest["feature_schema"] == METADATA["feature_schema"]
+    assert {"scikit-learn", "xgboost"} <= set(manifest["libraries"])
+    assert joblib.load(directory / "metadata.joblib")["model_version"] == "v1"
+
+
+def test_corrupted_or_truncated_artifact_is_rejected(tmp_path):
+    directory = save_artifacts(tmp_path, {"weights": list(range(1000))}, METADATA, version="v1")
+    path = directory / MODEL_FILE
+    data = bytearray(path.read_bytes())
+
+    path.write_bytes(data[:-10])
+    with pytest.raises(ArtifactError, match="incomplet"):
+        verify_artifacts(directory)
+
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ArtifactError, match="SHA-256"):
+        verify_artifacts(directory)
+
+
+def test_existing_version_is_not_overwritten(tmp_path):
+    save_artifacts(tmp_path, {}, METADATA, version="v1")
+    with pytest.raises(ArtifactError):
+        save_artifacts(tmp_path, {}, METADATA, version="v1")
+
+
+def test_feature_schema_compatibility():
+    expected = {"PrimaryPropertyType": "categorical", "YearBuilt": "numeric"}
+    check_feature_schema(METADATA["feature_schema"], expected)
+    check_feature_schema({"PrimaryPropertyType": None, "YearBuilt": None}, expected)
+    with pytest.raises(ArtifactError, match="types"):
+        check_feature_schema({"PrimaryPropertyType": "numeric", "YearBuilt": "numeric"}, expected)
+    with pytest.raises(ArtifactError, match="features"):
+        check_feature_schema({"YearBuilt": "numeric"}, expected)
+
+
+def test_load_model_from_versioned_directory(tmp_path, monkeypatch):
+    served_model, served_metadata = model_module.load_model()
+    save_artifacts(tmp_path, served_model, served_metadata, compress=3, version="v2")
+
+    monkeypatch.setattr(model_module, "MODELS_DIR", str(tmp_path))
+    for cached in (model_module._served_artifacts, model_module.load_model,
+                   model_module.load_quantile_model, model_module.get_model_version):
+        cached.cache_clear()
+    try:
+        assert model_module.get_model_version() == "v2"
+        assert model_module.load_quantile_model() is None
+        assert model_module.load_model()[1]["feature_names"] == served_metadata["feature_names"]
+    finally:
+        for cached in (model_module._served_artifacts, model_module.load_model,
+                       model_module.load_quantile_model, model_module.get_model_version):
+            cached.cache_clear()
+
+
+def test_benchmark_compression_shrinks_artifact():
+    results = benchmark_compression({"weights": [0.0] * 10_000}, levels=(0, 3), repeat=1)
+    assert [r["compress"] for r in results] == [0, 3]
+    assert results[1]["bytes"] < results[0]["bytes"]
+
+
+def test_startup_rejects_incompatible_model(monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(main, "get_feature_schema", lambda: {"Autre": "numeric"})
+    with pytest.raises(ArtifactError):
+        main._check_model()
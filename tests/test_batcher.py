@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from src.batcher import DynamicBatcher
+
+
+def _double(inputs):
+    return [x["v"] * 2.0 for x in inputs]
+
+
+def test_concurrent_calls_share_one_batch():
+    calls = []
+    start = threading.Barrier(8)
+
+    def predict_batch(inputs):
+        calls.append(len(inputs))
+        return _double(inputs)
+
+    batcher = DynamicBatcher(predict_batch, max_batch_size=64, max_wait_ms=200)
+    results = {}
+
+    def worker(i):
+        start.wait()
+        results[i] = batcher.predict({"v": i}, timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: i * 2.0 for i in range(8)}
+    assert sum(calls) == 8 and len(calls) < 8
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == len(calls)
+    assert stats["latency_ms"]["count"] == 8
+
+
+def test_max_batch_size_is_respected():
+    sizes = []
+
+    def predict_batch(inputs):
+        sizes.append(len(inputs))
+        return _double(inputs)
+
+    batcher = DynamicBatcher(predict_batch, max_batch_size=3, max_wait_ms=50)
+    futures = [batcher.submit({"v": i}) for i in range(7)]
+    assert [f.result(timeout=5) for f in futures] == [i * 2.0 for i in range(7)]
+    assert max(sizes) <= 3
+
+
+def test_failing_input_does_not_fail_the_batch():
+    def predict_batch(inputs):
+        if any(x["v"] < 0 for x in inputs):
+            raise ValueError("entrée invalide")
+        return _double(inputs)
+
+    batcher = DynamicBatcher(predict_batch, max_batch_size=8, max_wait_ms=50)
+    ok, bad = batcher.submit({"v": 1}), batcher.submit({"v": -1})
+    assert ok.result(timeout=5) == 2.0
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+
+
+def test_unexpected_error_fails_pending_callers_and_worker_survives(monkeypatch):
+    batcher = DynamicBatcher(_double, max_batch_size=8, max_wait_ms=50)
+    broken = RuntimeError("histogramme indisponible")
+
+    def observe(value):
+        raise broken
+
+    monkeypatch.setattr(batcher.batch_sizes, "observe", observe)
+    futures = [batcher.submit({"v": i}) for i in range(3)]
+    for fut in futures:
+        with pytest.raises(RuntimeError):
+            fut.result(timeout=5)
+
+    monkeypatch.undo()
+    assert batcher.predict({"v": 4}, timeout=5) == 8.0
+
+
+def test_wrong_result_count_falls_back_to_single_rows():
+    def predict_batch(inputs):
+        return _double(inputs)[:1]
+
+    batcher = DynamicBatcher(predict_batch, max_batch_size=8, max_wait_ms=50)
+    futures = [batcher.submit({"v": i}) for i in range(3)]
+    assert [f.result(timeout=5) for f in futures] == [0.0, 2.0, 4.0]
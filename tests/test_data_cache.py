@@ -0,0 +1,37 @@
+import pandas as pd
+
+from src.data_cache import load_dataset
+
+
+def _write(path, types):
+    pd.DataFrame({
+        "PrimaryPropertyType": types,
+        "YearBuilt": [2000, 1990, 2010][:len(types)],
+        "TotalGHGEmissions": [1.5, 2.5, 3.5][:len(types)],
+    }).to_csv(path, index=False)
+
+
+def test_cache_is_typed_and_reused(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    _write(csv_path, ["Office", "Hotel"])
+
+    df = load_dataset(csv_path)
+    assert isinstance(df["PrimaryPropertyType"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_integer_dtype(df["YearBuilt"])
+    caches = list((tmp_path / ".cache").glob("data-*.feather"))
+    assert len(caches) == 1
+
+    mtime = caches[0].stat().st_mtime_ns
+    pd.testing.assert_frame_equal(load_dataset(csv_path), df)
+    assert caches[0].stat().st_mtime_ns == mtime
+
+
+def test_cache_rebuilt_when_source_changes(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    _write(csv_path, ["Office", "Hotel"])
+    load_dataset(csv_path)
+
+    _write(csv_path, ["Office", "Hotel", "Warehouse"])
+    df = load_dataset(csv_path)
+    assert len(df) == 3
+    assert len(list((tmp_path / ".cache").glob("data-*.feather"))) == 1
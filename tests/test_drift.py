@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from src.drift import DriftMonitor, OTHER, reference_histogram
+
+
+def _reference(rng):
+    train = pd.DataFrame({
+        "YearBuilt": rng.integers(1900, 2015, 2000),
+        "PrimaryPropertyType": rng.choice(["Office", "Hotel", "Warehouse"], 2000),
+    })
+    return {
+        "features": {col: reference_histogram(train[col]) for col in train.columns},
+        "prediction": reference_histogram(pd.Series(rng.gamma(2.0, 100.0, 2000))),
+    }
+
+
+def test_reference_histogram_shapes():
+    num = reference_histogram(pd.Series([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, None]))
+    assert num["type"] == "numeric"
+    assert len(num["proportions"]) == len(num["cuts"]) + 1
+    assert abs(sum(num["proportions"]) - 1) < 1e-9
+
+    cat = reference_histogram(pd.Series(["a", "b", "a"]))
+    assert cat["categories"][-1] == OTHER and cat["proportions"][-1] == 0.0
+
+
+def test_monitor_flags_shifted_traffic_only():
+    rng = np.random.default_rng(0)
+    reference = _reference(rng)
+
+    def rows(years, types, preds):
+        return [
+            {"YearBuilt": y, "PrimaryPropertyType": t, "predicted_co2": p}
+            for y, t, p in zip(years, types, preds)
+        ]
+
+    same = DriftMonitor(reference)
+    same.update(rows(rng.integers(1900, 2015, 1000), rng.choice(["Office", "Hotel", "Warehouse"], 1000),
+                     rng.gamma(2.0, 100.0, 1000)), last_id=1000)
+    stable = same.report()
+    assert stable["rows"] == 1000 and stable["last_prediction_id"] == 1000
+    assert stable["features"]["YearBuilt"]["status"] == "stable"
+    assert stable["features"]["PrimaryPropertyType"]["status"] == "stable"
+
+    shifted = DriftMonitor(reference)
+    shifted.update(rows(rng.integers(2016, 2024, 1000), ["Data Center"] * 1000,
+                        rng.gamma(2.0, 400.0, 1000)), last_id=1000)
+    report = shifted.report()
+    assert report["features"]["YearBuilt"]["status"] == "forte"
+    assert report["features"]["YearBuilt"]["ks"] > 0.8
+    assert report["features"]["PrimaryPropertyType"]["status"] == "forte"
+    assert report["prediction"]["psi"] > stable["prediction"]["psi"]
+    assert 'co2_drift_psi{feature="YearBuilt"}' in shifted.prometheus()
@@ -1,8 +1,8 @@
 import os
 import numpy as np
-import pandas as pd
 import pytest
 
+from src.data_cache import load_dataset
 from src.model import load_model, predict
 
 
@@ -13,7 +13,7 @@ class TestModelMinimal:
             os.path.dirname(__file__), "..", "src", "ville_de_seattle.csv"
         )
         try:
-            return pd.read_csv(data_path)
+            return load_dataset(data_path)
         except FileNotFoundError:
             pytest.skip("Fichier ville_de_seattle.csv non trouvé")
 
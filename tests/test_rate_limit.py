@@ -0,0 +1,178 @@
+import pytest
+
+from infra.config import ApiKey, get_api_keys, hash_api_key
+from infra.rate_limit import InMemoryRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_exhausts_then_refills():
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(clock=clock)
+    limits = ApiKey("a", rate_per_second=1.0, burst=3, daily_quota=0)
+
+    decisions = [limiter.hit_sync("a", limits) for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert decisions[2].remaining == 0
+    assert decisions[3].reason == "rate" and decisions[3].retry_after >= 1
+
+    clock.now += 1.0
+    assert limiter.hit_sync("a", limits).allowed
+
+
+def test_daily_quota_resets_next_day():
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(clock=clock)
+    limits = ApiKey("a", rate_per_second=0, burst=1, daily_quota=2)
+
+    assert limiter.hit_sync("a", limits).allowed
+    assert limiter.hit_sync("a", limits).allowed
+    refused = limiter.hit_sync("a", limits)
+    assert not refused.allowed and refused.reason == "quota"
+    assert "Retry-After" in refused.headers()
+
+    clock.now += 86400
+    assert limiter.hit_sync("a", limits).allowed
+
+
+def test_identities_are_isolated():
+    limiter = InMemoryRateLimiter(clock=FakeClock())
+    limits = ApiKey("a", rate_per_second=1.0, burst=1, daily_quota=0)
+    assert limiter.hit_sync("a", limits).allowed
+    assert not limiter.hit_sync("a", limits).allowed
+    assert limiter.hit_sync("b", limits).allowed
+
+
+@pytest.fixture
+def api_keys_env(monkeypatch):
+    monkeypatch.setenv("API_KEY", "legacy")
+    monkeypatch.setenv("API_KEYS", "alice:s3cret:0.01:4:100, bob:other")
+    monkeypatch.setenv("RATE_LIMIT_RPS", "5")
+    monkeypatch.setenv("RATE_LIMIT_BURST", "10")
+    get_api_keys.cache_clear()
+    yield
+    get_api_keys.cache_clear()
+
+
+def test_api_keys_are_hashed_with_limits(api_keys_env):
+    keys = get_api_keys()
+    assert "s3cret" not in keys
+    assert keys[hash_api_key("s3cret")] == ApiKey("alice", 0.01, 4, 100)
+    assert keys[hash_api_key("other")] == ApiKey("bob", 5.0, 10, 0)
+    assert keys[hash_api_key("legacy")].name == "default"
+
+
+def test_rate_limit_middleware(client, api_keys_env, monkeypatch):
+    import app.main as main
+
+    monkeypatch.setenv("AUTH_ENABLED", "true")
+    monkeypatch.setattr(main, "_rate_limiter", InMemoryRateLimiter())
+
+    headers = {"X-API-Key": "s3cret"}
+    statuses = [client.get("/model_info", headers=headers).status_code for _ in range(5)]
+    assert statuses == [200, 200, 200, 200, 429]
+
+    r = client.get("/model_info", headers=headers)
+    assert r.status_code == 429
+    assert "Retry-After" in r.headers and r.headers["RateLimit-Remaining"] == "0"
+
+    r = client.get("/model_info", headers={"X-API-Key": "other"})
+    assert r.status_code == 200 and r.headers["RateLimit-Limit"] == "10"
+
+    assert client.get("/model_info", headers={"X-API-Key": "wrong"}).status_code == 401
+    assert client.get("/health").status_code == 200
+
+
+def test_cost_is_charged_per_row():
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(clock=clock)
+    limits = ApiKey("a", rate_per_second=1.0, burst=10, daily_quota=0)
+
+    assert limiter.hit_sync("a", limits, cost=4).remaining == 6
+    # un lot plus grand que la rafale passe seau plein, puis laisse le seau en dette
+    refused = limiter.hit_sync("a", limits, cost=50)
+    assert not refused.allowed and refused.retry_after == 4
+    clock.now += 4
+    assert limiter.hit_sync("a", limits, cost=50).allowed
+    clock.now += 30
+    assert not limiter.hit_sync("a", limits).allowed
+    clock.now += 11
+    assert limiter.hit_sync("a", limits).allowed
+
+
+def test_quota_is_charged_per_row():
+    limiter = InMemoryRateLimiter(clock=FakeClock())
+    limits = ApiKey("a", rate_per_second=0, burst=1, daily_quota=100)
+
+    assert limiter.hit_sync("a", limits, cost=60).allowed
+    refused = limiter.hit_sync("a", limits, cost=60)
+    assert not refused.allowed and refused.reason == "quota"
+    assert limiter.hit_sync("a", limits, cost=40).allowed
+
+
+def test_batch_endpoints_are_charged_per_row(client, valid_payload, api_keys_env, monkeypatch):
+    import app.main as main
+
+    monkeypatch.setattr(main, "_rate_limiter", InMemoryRateLimiter())
+    headers = {"X-API-Key": "s3cret"}  # rafale de 4, quota de 100
+
+    r = client.post("/predict/batch", json=[valid_payload] * 3, headers=headers)
+    assert r.status_code == 200 and r.headers["RateLimit-Remaining"] == "1"
+    assert len(r.json()["predictions"]) == 3
+    assert client.post("/explain/batch", json=[valid_payload] * 2, headers=headers).status_code == 429
+
+
+def test_websocket_is_charged_per_record(client, valid_payload, api_keys_env, monkeypatch):
+    import app.main as main
+    from starlette.websockets import WebSocketDisconnect
+
+    monkeypatch.setenv("API_KEYS", "carol:k3y:0:1:3")
+    get_api_keys.cache_clear()
+    monkeypatch.setattr(main, "_rate_limiter", InMemoryRateLimiter())
+
+    with client.websocket_connect("/ws/predict", headers={"X-API-Key": "k3y"}) as ws:
+        ws.send_json(valid_payload)  # la poignée de main a consommé 1 unité du quota de 3
+        assert "prediction" in ws.receive_json()
+        ws.send_json(valid_payload)
+        assert "prediction" in ws.receive_json()
+        ws.send_json(valid_payload)
+        with pytest.raises(WebSocketDisconnect) as e:
+            ws.receive_json()
+    assert e.value.code == 1008
+
+
+def test_prune_keeps_throttled_buckets(monkeypatch):
+    monkeypatch.setattr(InMemoryRateLimiter, "MAX_IDENTITIES", 2)
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(clock=clock)
+    slow = ApiKey("alice", rate_per_second=0.01, burst=4, daily_quota=0)  # plein en 400 s
+    fast = ApiKey("anon", rate_per_second=1.0, burst=4, daily_quota=0)  # plein en 4 s
+
+    for _ in range(4):
+        assert limiter.hit_sync("alice", slow).allowed
+    limiter.hit_sync("ip:1", fast)
+    clock.now += 10
+    limiter.hit_sync("ip:2", fast)  # nouvelle identité : nettoyage
+
+    assert "ip:1" not in limiter._buckets
+    assert not limiter.hit_sync("alice", slow).allowed  # toujours limitée
+
+
+def test_quota_only_usage_is_pruned(monkeypatch):
+    monkeypatch.setattr(InMemoryRateLimiter, "MAX_IDENTITIES", 100)
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(clock=clock)
+    limits = ApiKey("anon", rate_per_second=0.0, burst=20, daily_quota=100)
+
+    for day in range(3):
+        for i in range(500):
+            assert limiter.hit_sync(f"ip:{day}:{i}", limits).allowed
+        clock.now += 86400
+    assert not limiter._buckets
+    assert len(limiter._usage) <= 500  # seuls les compteurs du jour en cours subsistent
@@ -0,0 +1,75 @@
+import logging
+import time
+
+import orjson
+
+from infra.tracing import OTLPExporter, Trace, _current, span, to_otlp
+
+
+def test_spans_and_server_timing():
+    trace = Trace("POST /predict")
+    token = _current.set(trace)
+    try:
+        with span("model"):
+            pass
+        with span("db"):
+            pass
+        with span("db"):
+            pass
+    finally:
+        _current.reset(token)
+    trace.finish()
+
+    assert list(trace.breakdown()) == ["model", "db"]
+    header = trace.server_timing()
+    assert header.startswith("model;dur=") and header.endswith(f"total;dur={trace.duration_ms:.2f}")
+
+
+def test_span_without_trace_is_noop():
+    with span("model"):
+        pass
+
+
+def test_traceparent_is_propagated():
+    trace = Trace("GET /", traceparent="00-" + "a" * 32 + "-" + "b" * 16 + "-01")
+    trace.finish()
+    spans = to_otlp([trace], "test")["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert spans[0]["traceId"] == "a" * 32
+    assert spans[0]["parentSpanId"] == "b" * 16
+
+
+def test_otlp_file_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = OTLPExporter(f"file://{path}", service_name="test", interval_s=0.01)
+    trace = Trace("POST /predict", request_id="r1")
+    trace.mark("validation")
+    trace.finish()
+    exporter.export(trace)
+
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    payload = orjson.loads(path.read_bytes().splitlines()[0])
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [s["name"] for s in spans] == ["POST /predict", "validation"]
+    assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+
+
+def test_slow_requests_are_logged(client, caplog, monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(main._tracer, "slow_ms", 0.0)
+    with caplog.at_level(logging.WARNING, logger="app.tracing"):
+        client.get("/health", headers={"X-Request-ID": "slow-1"})
+    records = [orjson.loads(r.getMessage()) for r in caplog.records if r.name == "app.tracing"]
+    assert records and records[-1]["request_id"] == "slow-1"
+    assert records[-1]["event"] == "slow_request"
+
+
+def test_fast_requests_are_not_logged(client, caplog, monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(main._tracer, "slow_ms", 60_000.0)
+    with caplog.at_level(logging.WARNING, logger="app.tracing"):
+        client.get("/health")
+    assert not [r for r in caplog.records if r.name == "app.tracing"]
@@ -1,7 +1,8 @@
 # gradio.py
-import os, sys
+import os, sys, time, asyncio, tempfile
 from datetime import datetime
-import requests
+import httpx
+import pandas as pd
 import gradio as gr
 
 # =======================
@@ -9,6 +10,17 @@ import gradio as gr
 # =======================
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000").rstrip("/")
 API_KEY = os.getenv("API_KEY")  # facultatif (si AUTH activée côté API)
+HTTP_TIMEOUT = float(os.getenv("UI_HTTP_TIMEOUT", 10))
+HTTP_MAX_CONNECTIONS = int(os.getenv("UI_HTTP_MAX_CONNECTIONS", 20))
+MODEL_INFO_TTL = float(os.getenv("UI_MODEL_INFO_TTL", 300))  # secondes
+UI_CONCURRENCY = int(os.getenv("UI_CONCURRENCY", 8))  # appels API simultanés par événement
+UI_QUEUE_SIZE = int(os.getenv("UI_QUEUE_SIZE", 64))  # au-delà, les nouveaux clics sont refusés
+BATCH_CHUNK_SIZE = int(os.getenv("UI_BATCH_CHUNK_SIZE", 500))  # lignes par appel à /predict/batch
+
+FEATURES = [
+    "PrimaryPropertyType", "YearBuilt", "NumberofBuildings",
+    "NumberofFloors", "LargestPropertyUseType", "LargestPropertyUseTypeGFA",
+]
 
 # --- mes informations ---
 AUTHOR_NAME = "Par Abdourahamane LY"
@@ -25,11 +37,68 @@ def _headers():
         h["X-API-Key"] = API_KEY
     return h
 
+# =======================
+# CLIENT HTTP PARTAGÉ
+# =======================
+_client: httpx.AsyncClient | None = None
+_inflight: dict = {}  # requêtes identiques en cours -> tâche partagée
+_model_info_cache = {"value": None, "expires": 0.0}
+
+def _get_client() -> httpx.AsyncClient:
+    """Client unique (connexions keep-alive réutilisées), créé dans la boucle de Gradio."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=API_BASE_URL,
+            headers=_headers(),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=3.0),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+async def _coalesced(key, factory):
+    """Un seul appel réseau pour des requêtes identiques simultanées."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield : l'annulation d'un appelant n'annule pas la requête des autres
+    return await asyncio.shield(task)
+
+async def _get_model_info() -> dict:
+    """Infos modèle mises en cache `MODEL_INFO_TTL` secondes."""
+    if _model_info_cache["value"] is not None and time.monotonic() < _model_info_cache["expires"]:
+        return _model_info_cache["value"]
+
+    async def fetch():
+        r = await _get_client().get("/model_info")
+        r.raise_for_status()
+        return r.json()
+
+    info = await _coalesced(("model_info",), fetch)
+    _model_info_cache.update(value=info, expires=time.monotonic() + MODEL_INFO_TTL)
+    return info
+
+def _format_model_info(m: dict) -> str:
+    perf = m.get("performance", {})
+    return (
+        f"**Modèle :** {m.get('model_type','-')}\n"
+        f"- RMSE : {perf.get('rmse','-')}\n"
+        f"- MAE : {perf.get('mae','-')}\n"
+        f"- WAPE : {perf.get('wape','-')}\n"
+        f"- R² : {perf.get('r2_score','-')}\n\n"
+        f"{m.get('description','')}"
+    )
+
 # =======================
 # APPELS API
 # =======================
-def predict_co2(primary_property_type, year_built, number_of_buildings,
-                number_of_floors, largest_property_use_type, largest_property_use_type_gfa):
+async def predict_co2(primary_property_type, year_built, number_of_buildings,
+                      number_of_floors, largest_property_use_type, largest_property_use_type_gfa):
     payload = {
         "PrimaryPropertyType": primary_property_type,
         "YearBuilt": int(year_built),
@@ -38,46 +107,87 @@ def predict_co2(primary_property_type, year_built, number_of_buildings,
         "LargestPropertyUseType": largest_property_use_type,
         "LargestPropertyUseTypeGFA": float(largest_property_use_type_gfa),
     }
+
+    async def post():
+        r = await _get_client().post("/predict", params={"minimal": "true"}, json=payload)
+        return r.status_code, (r.json() if r.status_code == 200 else r.text)
+
     try:
-        r = requests.post(f"{API_BASE_URL}/predict", json=payload, headers=_headers(), timeout=20)
-        if r.status_code != 200:
-            return f"**Erreur API** : {r.status_code} — {r.text}"
-        result = r.json()
-        perf = (result.get("model_info") or {}).get("performance", {})
-        desc = (result.get("model_info") or {}).get("description", "")
-        unit = result.get("unit", "")
+        status, result = await _coalesced(("predict", tuple(sorted(payload.items()))), post)
+        if status != 200:
+            return f"**Erreur API** : {status} — {result}"
+        try:
+            info = _format_model_info(await _get_model_info())
+        except httpx.HTTPError:
+            info = "_Infos modèle indisponibles._"
 
         return (
-            f"### Prédiction CO₂ : **{result['prediction']:.2f} {unit}**\n\n"
-            f"**Modèle :** {(result.get('model_info') or {}).get('model_type','-')}\n"
-            f"- RMSE : {perf.get('rmse','-')}\n"
-            f"- MAE : {perf.get('mae','-')}\n"
-            f"- WAPE : {perf.get('wape','-')}\n"
-            f"- R² : {perf.get('r2_score','-')}\n\n"
-            f"{desc}"
+            f"### Prédiction CO₂ : **{result['prediction']:.2f} Metric Tons CO2e**\n\n"
+            f"{info}"
         )
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         return "Impossible de se connecter à l'API. Vérifie que l’API est lancée et que API_BASE_URL est correct."
     except Exception as e:
         return f"Erreur : {e}"
 
-def fetch_model_info():
+async def fetch_model_info():
     try:
-        r = requests.get(f"{API_BASE_URL}/model_info", headers=_headers(), timeout=15)
-        r.raise_for_status()
-        m = r.json()
-        perf = m.get("performance", {})
-        return (
-            f"**Modèle :** {m.get('model_type','-')}\n"
-            f"- RMSE : {perf.get('rmse','-')}\n"
-            f"- MAE : {perf.get('mae','-')}\n"
-            f"- WAPE : {perf.get('wape','-')}\n"
-            f"- R² : {perf.get('r2_score','-')}\n\n"
-            f"{m.get('description','')}"
-        )
+        return _format_model_info(await _get_model_info())
     except Exception as e:
         return f"Impossible de récupérer les infos modèle : {e}"
 
+async def score_csv(file, progress=gr.Progress()):
+    """Score un CSV de bâtiments par paquets via /predict/batch."""
+    empty = (None, None, None)
+    if file is None:
+        return ("Aucun fichier fourni.", *empty)
+    try:
+        df = pd.read_csv(file)
+    except Exception as e:
+        return (f"Lecture du CSV impossible : {e}", *empty)
+    missing = [c for c in FEATURES if c not in df.columns]
+    if missing:
+        return (f"Colonnes manquantes : {', '.join(missing)}", *empty)
+
+    rows = df[FEATURES].astype(object).where(df[FEATURES].notna(), None).to_dict("records")
+    predictions = [None] * len(rows)
+    errors = [None] * len(rows)
+    try:
+        for start in range(0, len(rows), BATCH_CHUNK_SIZE):
+            progress(start / max(len(rows), 1), desc=f"{start}/{len(rows)} lignes scorées")
+            chunk = [{"id": start + i, **row} for i, row in enumerate(rows[start:start + BATCH_CHUNK_SIZE])]
+            r = await _get_client().post("/predict/batch", json=chunk)
+            if r.status_code != 200:
+                return (f"**Erreur API** : {r.status_code} — {r.text}", *empty)
+            for item in r.json()["predictions"]:
+                if "prediction" in item:
+                    predictions[item["id"]] = item["prediction"]
+                else:
+                    errors[item["id"]] = str(item["error"])
+    except httpx.ConnectError:
+        return ("Impossible de se connecter à l'API. Vérifie que l’API est lancée et que API_BASE_URL est correct.", *empty)
+    progress(1.0, desc=f"{len(rows)}/{len(rows)} lignes scorées")
+
+    out = df.copy()
+    out["prediction_co2"] = predictions
+    out["erreur"] = errors
+    with tempfile.NamedTemporaryFile("w", suffix="_predictions.csv", delete=False, encoding="utf-8") as f:
+        out.to_csv(f, index=False)
+
+    scored = out.dropna(subset=["prediction_co2"])
+    by_type = (
+        scored.groupby("PrimaryPropertyType", as_index=False)["prediction_co2"]
+        .mean()
+        .sort_values("prediction_co2", ascending=False)
+    )
+    summary = (
+        f"**{len(scored)}** lignes scorées, **{len(out) - len(scored)}** en erreur.\n\n"
+        f"- Total : {scored['prediction_co2'].sum():.1f} Metric Tons CO2e\n"
+        f"- Moyenne : {scored['prediction_co2'].mean():.2f} — Médiane : {scored['prediction_co2'].median():.2f}"
+        if len(scored) else f"Aucune ligne scorée ({len(out)} en erreur)."
+    )
+    return summary, f.name, by_type, scored[["LargestPropertyUseTypeGFA", "prediction_co2", "PrimaryPropertyType"]]
+
 # =======================
 # UI
 # =======================
@@ -105,29 +215,54 @@ with gr.Blocks(title="Prédiction CO₂ des Bâtiments") as demo:
             f"[Site]({AUTHOR_SITE})"
         )
 
-    with gr.Row():
-        primary_type = gr.Dropdown(property_types, label="Type de Propriété Principal", value="Small- and Mid-Sized Office")
-        year_built = gr.Number(label="Année de Construction", value=2000, minimum=1800, maximum=datetime.now().year)
-        num_buildings = gr.Number(label="Nombre de Bâtiments", value=1, minimum=1)
+    with gr.Tab("Prédiction"):
+        with gr.Row():
+            primary_type = gr.Dropdown(property_types, label="Type de Propriété Principal", value="Small- and Mid-Sized Office")
+            year_built = gr.Number(label="Année de Construction", value=2000, minimum=1800, maximum=datetime.now().year)
+            num_buildings = gr.Number(label="Nombre de Bâtiments", value=1, minimum=1)
 
-    with gr.Row():
-        num_floors = gr.Number(label="Nombre d'Étages", value=4, minimum=0)
-        largest_use_type = gr.Dropdown(use_types, label="Plus grand type d’usage", value="Office")
-        gfa = gr.Number(label="Surface du plus grand usage (ft²)", value=10000, minimum=10)
+        with gr.Row():
+            num_floors = gr.Number(label="Nombre d'Étages", value=4, minimum=0)
+            largest_use_type = gr.Dropdown(use_types, label="Plus grand type d’usage", value="Office")
+            gfa = gr.Number(label="Surface du plus grand usage (ft²)", value=10000, minimum=10)
 
-    with gr.Row():
-        predict_btn = gr.Button("Prédire", variant="primary")
-        info_btn = gr.Button("Infos modèle")
+        with gr.Row():
+            predict_btn = gr.Button("Prédire", variant="primary")
+            info_btn = gr.Button("Infos modèle")
 
-    prediction_md = gr.Markdown()
-    info_md = gr.Markdown()
+        prediction_md = gr.Markdown()
+        info_md = gr.Markdown()
 
-    predict_btn.click(
-        predict_co2,
-        inputs=[primary_type, year_built, num_buildings, num_floors, largest_use_type, gfa],
-        outputs=prediction_md
-    )
-    info_btn.click(fetch_model_info, outputs=info_md)
+        predict_btn.click(
+            predict_co2,
+            inputs=[primary_type, year_built, num_buildings, num_floors, largest_use_type, gfa],
+            outputs=prediction_md
+        )
+        info_btn.click(fetch_model_info, outputs=info_md)
+
+    with gr.Tab("Scoring par lot (CSV)"):
+        gr.Markdown(
+            "Importer un CSV contenant les colonnes "
+            + ", ".join(f"`{c}`" for c in FEATURES)
+            + ". Les lignes sont scorées par paquets ; les colonnes supplémentaires sont conservées."
+        )
+        csv_in = gr.File(label="CSV de bâtiments", file_types=[".csv"])
+        score_btn = gr.Button("Scorer le fichier", variant="primary")
+        batch_md = gr.Markdown()
+        csv_out = gr.File(label="Prédictions (CSV)")
+        with gr.Row():
+            by_type_plot = gr.BarPlot(
+                x="PrimaryPropertyType", y="prediction_co2",
+                title="Émissions moyennes par type de propriété", x_label_angle=-45,
+            )
+            gfa_plot = gr.ScatterPlot(
+                x="LargestPropertyUseTypeGFA", y="prediction_co2", color="PrimaryPropertyType",
+                title="Émissions prédites selon la surface",
+            )
+        score_btn.click(
+            score_csv, inputs=csv_in, outputs=[batch_md, csv_out, by_type_plot, gfa_plot],
+            concurrency_limit=2,
+        )
 
     with gr.Accordion("À propos", open=False):
         gr.Markdown(
@@ -136,6 +271,9 @@ with gr.Blocks(title="Prédiction CO₂ des Bâtiments") as demo:
             "- **Contexte** : modèle entraîné sur données de la ville de Seattle — prudence hors distribution\n"
         )
 
+# file d'attente Gradio : borne les appels simultanés vers l'API lors d'un pic sur la démo
+demo.queue(default_concurrency_limit=UI_CONCURRENCY, max_size=UI_QUEUE_SIZE)
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 7860))
     demo.launch(server_name="0.0.0.0", server_port=port, share=True, debug=False)